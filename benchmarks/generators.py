@@ -0,0 +1,128 @@
+"""Synthetic graphs of any size and shape for the benchmarks."""
+
+import random
+
+from harmonia.base.graph import Edge, Graph, Node, Process
+from harmonia.base.log import LogProviderFactory
+
+LOG_PROVIDER_FACTORY = LogProviderFactory(
+    uri="file://./runtime/{version}/logs/{name}.log"
+)
+
+
+def _edge(name: str) -> Edge:
+    return Edge(uri=f"file://./runtime/{{version}}/{name}")
+
+
+def _process(
+    name: str,
+    input_edges: list[Edge],
+    output_edges: list[Edge],
+    cmd: tuple[str, ...] = ("true",),
+) -> Process:
+    return Process(
+        node=Node(name=name, cmd=cmd, log_provider_factory=LOG_PROVIDER_FACTORY),
+        input_edges=input_edges,
+        output_edges=output_edges,
+    )
+
+
+def chain(size: int) -> tuple[list[Process], list[Edge]]:
+    """``size`` processes each consuming the output of the previous one."""
+    edges = [Edge(uri="file://./data/source")]
+    edges += [_edge(f"chain-{i}") for i in range(size)]
+    processes = [
+        _process(f"chain-{i:06d}", [edges[i]], [edges[i + 1]]) for i in range(size)
+    ]
+    return processes, edges
+
+
+def fan(size: int) -> tuple[list[Process], list[Edge]]:
+    """One source fanning out to ``size - 1`` processes, which one process joins."""
+    source = Edge(uri="file://./data/source")
+    sink = _edge("sink")
+    middle = [_edge(f"fan-{i}") for i in range(size - 1)]
+    processes = [
+        _process(f"fan-{i:06d}", [source], [edge]) for i, edge in enumerate(middle)
+    ]
+    processes.append(_process("join", middle, [sink]))
+    return processes, [source, sink, *middle]
+
+
+def diamonds(size: int) -> tuple[list[Process], list[Edge]]:
+    """A chain of diamonds, one split, two branches and one join each."""
+    edges = [Edge(uri="file://./data/source")]
+    processes = []
+    for i in range(max(size // 4, 1)):
+        split, left, right, join = (
+            _edge(f"diamond-{i}-{part}") for part in ["split", "left", "right", "join"]
+        )
+        processes += [
+            _process(f"diamond-{i:06d}-split", [edges[-1]], [split]),
+            _process(f"diamond-{i:06d}-left", [split], [left]),
+            _process(f"diamond-{i:06d}-right", [split], [right]),
+            _process(f"diamond-{i:06d}-join", [left, right], [join]),
+        ]
+        edges += [split, left, right, join]
+    return processes, edges
+
+
+def layered(
+    size: int, width: int = 100, fan_in: int = 3, seed: int = 0
+) -> tuple[list[Process], list[Edge]]:
+    """Layers of ``width`` processes, each reading random outputs of the layer before.
+
+    Every output of a layer is read by the next one so the graph stays
+    connected and every process but the last layer's feeds something.
+    """
+    rng = random.Random(seed)
+    previous = [Edge(uri="file://./data/source")]
+    edges = list(previous)
+    processes = []
+    for layer in range(max(size // width, 1)):
+        outputs = [_edge(f"layer-{layer}-{i}") for i in range(width)]
+        unread = list(previous)
+        rng.shuffle(unread)
+        for i, output in enumerate(outputs):
+            inputs = {unread.pop()} if unread else set()
+            inputs.update(rng.sample(previous, min(fan_in, len(previous))))
+            processes.append(
+                _process(f"layer-{layer:04d}-{i:06d}", sorted(inputs), [output])
+            )
+        # outputs no process of the next layer picked join in the first one
+        if unread:
+            first = processes[-width]
+            processes[-width] = first.model_copy(
+                update={"input_edges": tuple(sorted({*first.input_edges, *unread}))}
+            )
+        edges += outputs
+        previous = outputs
+    return processes, edges
+
+
+GENERATORS = {
+    "chain": chain,
+    "fan": fan,
+    "diamonds": diamonds,
+    "layered": layered,
+}
+
+
+def build(shape: str, size: int) -> Graph:
+    processes, edges = GENERATORS[shape](size)
+    return Graph(name=f"{shape}-{size}", processes=processes, edges=edges)
+
+
+def noop(size: int, cmd: tuple[str, ...] = ("true",)) -> Graph:
+    """``size`` independent processes running ``cmd``.
+
+    Edges are passed to ``cmd`` as arguments, which ``true`` and
+    ``python -c pass`` both ignore.
+    """
+    source = Edge(uri="file://./data/source")
+    outputs = [_edge(f"noop-{i}") for i in range(size)]
+    processes = [
+        _process(f"noop-{i:06d}", [source], [output], cmd)
+        for i, output in enumerate(outputs)
+    ]
+    return Graph(name=f"noop-{size}", processes=processes, edges=[source, *outputs])
@@ -0,0 +1,98 @@
+"""Time the graph model on synthetic graphs of growing size.
+
+Run with ``python -m benchmarks.graph_model --sizes 100 1000 10000`` from
+the repository root, results are written as JSON.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+
+from benchmarks.generators import GENERATORS, build
+from benchmarks.timing import best_of, write_results
+from harmonia.base.graph import Graph
+from harmonia.base.state import MODEL_CACHE, StateProvider, construct
+
+
+def _state_provider(root: str) -> StateProvider:
+    os.makedirs(f"{root}/graph")
+    return StateProvider(
+        graph_uri=f"file://{root}/graph/",
+        compiled_uri=f"file://{root}/compiled/",
+        running_uri=f"file://{root}/run/",
+        ledger_uri=f"file://{root}/ledger/",
+    )
+
+
+def bench_graph(shape: str, size: int, repeat: int) -> dict[str, float]:
+    processes, edges = GENERATORS[shape](size)
+    timings = {
+        "construct": best_of(
+            lambda: Graph(name=shape, processes=processes, edges=edges), repeat
+        )
+    }
+    graph = build(shape, size)
+    io = graph.full_io()
+    timings["full_io"] = best_of(graph.full_io, repeat)
+
+    def compile_fresh():
+        graph._compiled.clear()
+        return graph.compile_graph("bench", *io)
+
+    timings["compile_graph"] = best_of(compile_fresh, repeat)
+    compiled = graph.compile_graph("bench", *io)
+    timings["is_disjoint"] = best_of(lambda: compiled.is_disjoint(io[2][0]), repeat)
+
+    dumped = graph.model_dump()
+    timings["model_dump"] = best_of(graph.model_dump, repeat)
+    timings["model_validate"] = best_of(lambda: Graph.model_validate(dumped), repeat)
+    timings["construct_trusted"] = best_of(lambda: construct(Graph, dumped), repeat)
+    timings["json_size"] = len(json.dumps(dumped))
+
+    with tempfile.TemporaryDirectory() as root:
+        provider = _state_provider(root)
+        timings["state_write"] = best_of(lambda: provider.write_graph(graph), repeat)
+
+        def read_uncached():
+            MODEL_CACHE.clear()
+            return provider.read_graph(graph.name)
+
+        timings["state_read"] = best_of(read_uncached, repeat)
+        timings["state_read_cached"] = best_of(
+            lambda: provider.read_graph(graph.name), repeat
+        )
+        # without its digest the graph is validated in full
+        os.remove(f"{root}/graph/{graph.name}.json.sha256")
+        timings["state_read_validated"] = best_of(read_uncached, repeat)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--shapes", nargs="+", default=list(GENERATORS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="JSON file, stdout by default")
+    args = parser.parse_args()
+
+    results = []
+    for shape in args.shapes:
+        for size in args.sizes:
+            # one repetition is plenty for the biggest graphs
+            repeat = args.repeat if size < 100_000 else 1
+            for operation, value in bench_graph(shape, size, repeat).items():
+                results.append(
+                    {
+                        "shape": shape,
+                        "size": size,
+                        "operation": operation,
+                        "value": value,
+                        "unit": "bytes" if operation == "json_size" else "seconds",
+                    }
+                )
+    write_results("graph_model", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Time what the executor adds on top of the processes it runs.
+
+Runs thousands of no-op nodes (``true`` and ``python -c pass``) and
+measures, per process, the cost of building a log provider, of spawning a
+node and of supervising it compared to plain ``subprocess``, and the end
+to end throughput at several concurrency levels.  Run with
+``python -m benchmarks.orchestration --size 2000`` from the repository
+root, results are written as JSON.
+"""
+
+import argparse
+import contextlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.generators import LOG_PROVIDER_FACTORY, noop
+from benchmarks.timing import write_results
+from harmonia.base.graph import Executor
+
+COMMANDS = {
+    "true": ("true",),
+    "python": (sys.executable, "-c", "pass"),
+}
+
+
+def bench_log_setup(size: int) -> float:
+    """Building and closing one log provider, ``makedirs`` included."""
+    start = time.perf_counter()
+    for i in range(size):
+        LOG_PROVIDER_FACTORY.build(f"setup-{i % 100}", f"noop-{i:06d}").close()
+    return (time.perf_counter() - start) / size
+
+
+def bench_spawn(size: int, cmd: tuple[str, ...]) -> float:
+    """Starting one node, its log and output capture included."""
+    node = noop(1, cmd).processes[0].node
+    spawned = []
+    start = time.perf_counter()
+    for _ in range(size):
+        spawned.append(node.run("spawn", []))
+    elapsed = time.perf_counter() - start
+    for nm in spawned:
+        nm.wait()
+        nm.close()
+    return elapsed / size
+
+
+def bench_baseline(size: int, cmd: tuple[str, ...], concurrency: int) -> float:
+    """Plain ``subprocess`` running the same processes, in seconds."""
+    start = time.perf_counter()
+    # kept alive so subprocess does not reap them behind os.wait's back
+    running = {}
+    for _ in range(size):
+        if len(running) >= concurrency:
+            pid, status = os.wait()
+            running.pop(pid).returncode = os.waitstatus_to_exitcode(status)
+        process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+        running[process.pid] = process
+    while running:
+        pid, status = os.wait()
+        running.pop(pid).returncode = os.waitstatus_to_exitcode(status)
+    return time.perf_counter() - start
+
+
+def bench_executor(size: int, cmd: tuple[str, ...], concurrency: int) -> float:
+    """The executor running a graph of ``size`` no-op processes, in seconds."""
+    graph = noop(size, cmd)
+    compiled = graph.compile_graph("noop", *graph.full_io())
+    start = time.perf_counter()
+    return_codes = Executor(concurrency).run(compiled, f"run-{concurrency}")
+    elapsed = time.perf_counter() - start
+    assert set(return_codes.values()) == {0}, "No-op processes failed"
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--commands", nargs="+", default=list(COMMANDS))
+    parser.add_argument("--output", help="JSON file, stdout by default")
+    args = parser.parse_args()
+    output = args.output and os.path.abspath(args.output)
+
+    results = []
+
+    def record(measure: str, value: float, unit: str, **labels):
+        results.append({"measure": measure, "value": value, "unit": unit, **labels})
+
+    # logs go to ./runtime, keep them out of the working tree
+    with tempfile.TemporaryDirectory() as root, contextlib.chdir(root):
+        record("log_setup", bench_log_setup(args.size), "seconds per process")
+        for command in args.commands:
+            cmd = COMMANDS[command]
+            record(
+                "spawn",
+                bench_spawn(args.size, cmd),
+                "seconds per process",
+                command=command,
+            )
+            for concurrency in args.concurrency:
+                labels = {"command": command, "concurrency": concurrency}
+                baseline = bench_baseline(args.size, cmd, concurrency)
+                elapsed = bench_executor(args.size, cmd, concurrency)
+                record(
+                    "throughput", args.size / elapsed, "processes per second", **labels
+                )
+                record(
+                    "baseline_throughput",
+                    args.size / baseline,
+                    "processes per second",
+                    **labels,
+                )
+                record(
+                    "overhead",
+                    (elapsed - baseline) / args.size,
+                    "seconds per process",
+                    **labels,
+                )
+    write_results("orchestration", results, output)
+
+
+if __name__ == "__main__":
+    main()
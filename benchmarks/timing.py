@@ -0,0 +1,57 @@
+"""Timing helpers and the JSON result file shared by the benchmarks."""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime
+from typing import Any
+
+
+def best_of(function: Callable[[], Any], repeat: int) -> float:
+    """Fastest of ``repeat`` calls, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def _commit() -> str | None:
+    try:
+        # benchmarks may run from elsewhere, ask the repository they live in
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(benchmark: str, results: list[dict], output: str | None):
+    """Write results with what is needed to compare them across commits.
+
+    Results go to ``output``, or to stdout when it is not given.
+    """
+    report = {
+        "benchmark": benchmark,
+        "commit": _commit(),
+        "created": datetime.now(UTC).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if output is None:
+        sys.stdout.write(f"{text}\n")
+        return
+    with open(output, "w") as f:
+        f.write(text)
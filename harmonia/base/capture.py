@@ -0,0 +1,122 @@
+import codecs
+import os
+import queue
+import selectors
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from harmonia.base.log import LogProvider
+
+# bytes read from a pipe at once, at most this much output is held in memory
+CHUNK_SIZE = 1 << 16
+
+
+class Drain:
+    """Capture of one pipe, done once its output was handed to the log.
+
+    ``error`` tells why output did not all reach the log, e.g. it failed.
+    """
+
+    def __init__(self, fd: int):
+        self.fd = fd
+        self.done = threading.Event()
+        self.error: Exception | None = None
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self.done.wait(timeout)
+
+
+class LogCapture:
+    """Stream the output pipes of many children to their log providers.
+
+    A single thread selects over the read ends of all attached pipes and
+    writes whatever arrives to the log provider of the pipe, hence children
+    never share the orchestrator's ``sys.stdout`` and logs can go to any URI
+    a ``LogProvider`` supports.  A child writing faster than its log can be
+    written blocks on its full pipe.  Output of a pipe whose log fails is
+    read on and discarded until end of file, so the child does not die of a
+    broken pipe and every other pipe is still captured.
+    """
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self._selector = selectors.DefaultSelector()
+        self._attached = queue.SimpleQueue()
+        self._detached = queue.SimpleQueue()
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def attach(self, fd: int, logger: "LogProvider") -> Drain:
+        """Stream ``fd`` to ``logger`` until end of file, then close ``fd``."""
+        drain = Drain(fd)
+        self._attached.put((logger, drain))
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        self._wakeup()
+        return drain
+
+    def detach(self, drain: Drain, error: Exception):
+        """Stop capturing a pipe before its end of file, recording ``error``."""
+        self._detached.put((drain, error))
+        self._wakeup()
+
+    def _wakeup(self):
+        # the selector is only touched by the reader thread, wake it up
+        os.write(self._wakeup_w, b"\0")
+
+    def _close(self, drain: Drain, error: Exception | None = None):
+        if drain.done.is_set():
+            return
+        if drain.fd in self._selector.get_map():
+            self._selector.unregister(drain.fd)
+        os.close(drain.fd)
+        # the first error stopped the capture, keep it
+        drain.error = drain.error or error
+        drain.done.set()
+
+    def _register_attached(self):
+        os.read(self._wakeup_r, self.chunk_size)
+        while not self._attached.empty():
+            logger, drain = self._attached.get()
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            try:
+                self._selector.register(
+                    drain.fd, selectors.EVENT_READ, (logger, drain, decoder)
+                )
+            except (OSError, ValueError) as error:
+                self._close(drain, error)
+        while not self._detached.empty():
+            self._close(*self._detached.get())
+
+    def _read(self, key: selectors.SelectorKey):
+        logger, drain, decoder = key.data
+        try:
+            data = os.read(key.fd, self.chunk_size)
+        except OSError as error:
+            self._close(drain, error)
+            return
+        if drain.error is None:
+            try:
+                text = decoder.decode(data, final=not data)
+                if text:
+                    logger.write(text)
+            except Exception as error:
+                drain.error = error
+        if not data:
+            self._close(drain)
+
+    def _run(self):
+        while True:
+            for key, _ in self._selector.select():
+                if key.fd == self._wakeup_r:
+                    self._register_attached()
+                else:
+                    self._read(key)
+
+
+LOG_CAPTURE = LogCapture()
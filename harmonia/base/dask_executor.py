@@ -0,0 +1,54 @@
+import dask
+from dask.delayed import Delayed
+
+from harmonia.base.graph import SPAWN_FAILED, CompiledGraph, Process
+
+
+def run_process(process: Process, version: str, *upstream: int | None) -> int | None:
+    # upstream return codes only carry the dependencies between tasks
+    if any(return_code != 0 for return_code in upstream):
+        return None
+    try:
+        nm = process.node.run(version, process.build_args(version))
+    except OSError:
+        return SPAWN_FAILED
+    return_code = nm.wait()
+    nm.close()
+    return return_code
+
+
+class DaskExecutor:
+    """Run processes of a compiled graph as tasks of a dask graph.
+
+    Every process becomes one task depending on the tasks that produce its
+    input edges.  Without a ``client`` the current dask scheduler is used,
+    passing a ``distributed.Client`` runs the tasks on its cluster, be it a
+    ``LocalCluster`` or a remote scheduler.  Processes downstream of a failure
+    are not started, same as with the local ``Executor``.
+    """
+
+    def __init__(self, client=None):
+        self.client = client
+
+    def tasks(self, compiled: CompiledGraph, version: str) -> dict[str, Delayed]:
+        dependencies = compiled.dependencies()
+        tasks = {}
+        for process in compiled.topological_order:
+            upstream = [tasks[p] for p in sorted(dependencies[process])]
+            tasks[process] = dask.delayed(run_process, pure=False)(
+                process,
+                version,
+                *upstream,
+                dask_key_name=f"{compiled.name}-{version}-{process.node.name}",
+            )
+        return {process.node.name: task for process, task in tasks.items()}
+
+    def run(self, compiled: CompiledGraph, version: str) -> dict[str, int]:
+        tasks = self.tasks(compiled, version)
+        scheduler = self.client.get if self.client is not None else None
+        (return_codes,) = dask.compute(tasks, scheduler=scheduler)
+        return {
+            name: return_code
+            for name, return_code in sorted(return_codes.items())
+            if return_code is not None
+        }
@@ -0,0 +1,50 @@
+import os
+import threading
+from urllib.parse import urlsplit
+
+import pyarrow
+from pyarrow import fs
+
+# schemes where the URI authority is the bucket or container
+BUCKET_SCHEMES = {"s3", "gs", "gcs", "abfs", "abfss"}
+
+
+class FileSystemPool:
+    """Share one pyarrow filesystem per scheme and authority.
+
+    Remote filesystems keep their clients and connection pools alive, so
+    resolving every URI through the same pool reuses connections across
+    reads, writes and listings instead of opening new ones per call.
+    """
+
+    def __init__(self):
+        self._filesystems = {}
+        self._lock = threading.Lock()
+
+    def _filesystem(self, uri: str, key: tuple[str, str]) -> fs.FileSystem | None:
+        with self._lock:
+            if key not in self._filesystems:
+                try:
+                    filesystem, _ = fs.FileSystem.from_uri(uri)
+                except (pyarrow.ArrowInvalid, pyarrow.ArrowNotImplementedError):
+                    filesystem = None
+                self._filesystems[key] = filesystem
+            return self._filesystems[key]
+
+    def resolve(self, uri: str) -> tuple[fs.FileSystem, str] | None:
+        """Return the filesystem and path for a URI, ``None`` if unsupported."""
+        if uri.startswith("file://"):
+            path = os.path.abspath(uri[len("file://") :] or ".")
+            return self._filesystem("file:///", ("file", "")), path
+
+        parts = urlsplit(uri)
+        filesystem = self._filesystem(uri, (parts.scheme, parts.netloc))
+        if filesystem is None:
+            return None
+        path = parts.path.rstrip("/") or "/"
+        if parts.scheme in BUCKET_SCHEMES:
+            path = f"{parts.netloc}{path}".rstrip("/")
+        return filesystem, path
+
+
+FILESYSTEMS = FileSystemPool()
@@ -1,27 +1,153 @@
+import asyncio
 import os
 import subprocess
-from collections import defaultdict
+import time
+from collections import OrderedDict, defaultdict
+from collections.abc import Callable
+from datetime import UTC, datetime
+from functools import cached_property, partial
 from typing import Annotated, Any, Self
 
 from pydantic import BaseModel, model_validator
 from pydantic.functional_validators import BeforeValidator
 
-from harmonia.base import log
+from harmonia.base import log, usage
+from harmonia.base.capture import LOG_CAPTURE, Drain
+from harmonia.base.incremental import ManifestProvider
+from harmonia.base.journal import RunEvent, RunningJournal
+from harmonia.base.ledger import RunLedger, mean_durations
+from harmonia.base.probe import EdgeProbe
+from harmonia.base.resources import ResourcePool, Resources, detect_capacity
+from harmonia.base.supervisor import Supervisor
 from harmonia.base.validators import FILE_SCHEME, SCHEME, UNIQUE_ELEMENTS, VERSION
 
-HEARTBEAT_TIMEOUT = 0.1
+
+# exit code of a process which could not be started, as a shell reports it
+SPAWN_FAILED = 127
+# exit code of a process reaped elsewhere, its own exit code is lost
+EXIT_UNKNOWN = 255
+# compiled graphs memoized per graph, e.g. the cones of the latest versions
+COMPILED_CACHE_SIZE = 64
 
 
 class NodeMetadata:
-    def __init__(self, logger: log.LogProvider, meta: Any):
+    """A running node process, its log and the resources it used.
+
+    Processes started with ``subprocess`` are reaped with ``wait4`` so that
+    ``usage`` holds their wall and CPU time, peak RSS and block I/O once
+    they exited.  The event loop reaps ``asyncio`` processes itself, only
+    their wall time is known.  ``capture_error`` tells why output of the
+    process did not all reach its log.
+    """
+
+    # seconds to wait for output once the process exited
+    drain_timeout = 30.0
+
+    def __init__(
+        self,
+        logger: log.LogProvider,
+        meta: Any,
+        drain: Drain | None = None,
+        metrics: Callable[[], log.MetricProvider] | None = None,
+    ):
         self.logger = logger
         self.meta = meta
+        self.drain = drain
+        self.metrics = metrics
+        self.started = time.monotonic()
+        self.usage = {}
+
+    def _exited(self, usage: dict[str, float] | None = None):
+        if "wall_seconds" not in self.usage:
+            self.usage["wall_seconds"] = time.monotonic() - self.started
+            self.usage.update(usage or {})
+
+    def _reap(self, block: bool) -> int | None:
+        if self.meta.returncode is not None:
+            return self.meta.returncode
+        try:
+            reaped = usage.reap(self.meta.pid, block)
+        except AttributeError:
+            # no waitid on this platform
+            return_code = self.meta.wait() if block else self.meta.poll()
+            if return_code is not None:
+                self._exited()
+            return return_code
+        except ChildProcessError:
+            # already reaped elsewhere, Popen would report it as a success
+            self.meta.returncode = EXIT_UNKNOWN
+            self._exited()
+            return self.meta.returncode
+        if reaped is None:
+            return None
+        self.meta.returncode, process_usage = reaped
+        self._exited(process_usage)
+        return self.meta.returncode
+
+    @property
+    def capture_error(self) -> Exception | None:
+        return None if self.drain is None else self.drain.error
+
+    def poll(self) -> int | None:
+        if isinstance(self.meta, asyncio.subprocess.Process):
+            return self.meta.returncode
+        return self._reap(block=False)
+
+    def wait(self) -> int:
+        return self._reap(block=True)
+
+    @property
+    def drained(self) -> bool:
+        return self.drain is None or self.drain.done.is_set()
+
+    def close(self, timeout: float | None = None):
+        """Close the log once all output of the process was captured.
+
+        Output is waited for at most ``timeout`` seconds, ``drain_timeout``
+        by default.  With ``metrics`` the resource usage is logged to a new
+        metric provider.
+        """
+        if timeout is None:
+            timeout = self.drain_timeout
+        if self.drain is not None and not self.drain.wait(timeout):
+            # e.g. a grandchild inherited the pipe and is still running
+            LOG_CAPTURE.detach(
+                self.drain, TimeoutError(f"Output still open {timeout}s after exit")
+            )
+            self.drain.wait(self.drain_timeout)
+        self.logger.close()
+        if self.metrics is not None:
+            self._exited()
+            metric_provider = self.metrics()
+            for metric, value in self.usage.items():
+                metric_provider.log_metric(metric, value)
+            metric_provider.close()
+
+
+def _close_drained(closing: list[NodeMetadata]) -> list[NodeMetadata]:
+    """Close exited nodes whose output was all captured, return the others."""
+    still_open = []
+    for nm in closing:
+        if nm.drained:
+            nm.close()
+        else:
+            still_open.append(nm)
+    return still_open
+
+
+def _close_all(closing: list[NodeMetadata], timeout: float):
+    """Close exited nodes, waiting at most ``timeout`` seconds for all output."""
+    deadline = time.monotonic() + timeout
+    for nm in closing:
+        nm.close(max(0.0, deadline - time.monotonic()))
 
 
 class Node(BaseModel, frozen=True):
     name: str
     cmd: tuple[str, ...]
     log_provider_factory: log.LogProviderFactory
+    # resource usage of every run, keep it apart from metrics the node logs
+    usage_factory: log.MetricFactory | None = None
 
     def __lt__(self, other):
         return self.name < other.name
@@ -32,23 +158,66 @@ class Node(BaseModel, frozen=True):
     def __repr__(self: Self) -> str:
         return f"Node<{self.name} {self.cmd}>"
 
+    def _usage_metrics(self, version: str) -> Callable[[], log.MetricProvider] | None:
+        if self.usage_factory is None:
+            return None
+        return partial(self.usage_factory.build, version, self.name)
+
     def run(self: Self, version: str, args: list[str]) -> NodeMetadata:
         args = list(self.cmd) + args
         logger = self.log_provider_factory.build(version, self.name)
-        process = subprocess.Popen(
-            args,
-            stdout=logger.handle,
-            stderr=subprocess.STDOUT,
-            text=True,
+        read_fd, write_fd = os.pipe()
+        try:
+            process = subprocess.Popen(
+                args,
+                stdout=write_fd,
+                stderr=subprocess.STDOUT,
+            )
+        except BaseException as error:
+            os.close(read_fd)
+            logger.msg(f"Failed to start {self.name}: {error}")
+            logger.close()
+            raise
+        finally:
+            os.close(write_fd)
+        return NodeMetadata(
+            logger,
+            process,
+            LOG_CAPTURE.attach(read_fd, logger),
+            self._usage_metrics(version),
         )
-        return NodeMetadata(logger, process)
 
     def heartbeat(self: Self, nm: NodeMetadata, version: str) -> int | None:
+        return nm.poll()
+
+    async def run_async(self: Self, version: str, args: list[str]) -> NodeMetadata:
+        args = list(self.cmd) + args
+        logger = self.log_provider_factory.build(version, self.name)
+        read_fd, write_fd = os.pipe()
         try:
-            return nm.meta.wait(HEARTBEAT_TIMEOUT)
-        except subprocess.TimeoutExpired:
-            pass
-        return None
+            process = await asyncio.create_subprocess_exec(
+                *args,
+                stdout=write_fd,
+                stderr=subprocess.STDOUT,
+            )
+        except BaseException as error:
+            os.close(read_fd)
+            logger.msg(f"Failed to start {self.name}: {error}")
+            logger.close()
+            raise
+        finally:
+            os.close(write_fd)
+        return NodeMetadata(
+            logger,
+            process,
+            LOG_CAPTURE.attach(read_fd, logger),
+            self._usage_metrics(version),
+        )
+
+    async def wait_async(self: Self, nm: NodeMetadata) -> int:
+        return_code = await nm.meta.wait()
+        nm._exited()
+        return return_code
 
 
 class Edge(BaseModel, frozen=True):
@@ -69,15 +238,28 @@ class Edge(BaseModel, frozen=True):
     def build_uri(self, version: str) -> str:
         return self.uri.format(version=version)
 
-    def exists(self) -> bool:
-        return True
+    def exists(self, version: str) -> bool:
+        uri = self.build_uri(version)
+        return EdgeProbe(ttl=0).exists([uri])[uri]
 
 
 class LocalEdge(Edge):
     uri: Annotated[str, VERSION, FILE_SCHEME]
 
-    def exists(self) -> bool:
-        return os.path.exists(self.uri[len("file://") :])
+    def exists(self, version: str) -> bool:
+        return os.path.exists(self.build_uri(version)[len("file://") :])
+
+
+def edges_exist(
+    edges: list[Edge],
+    version: str,
+    probe: EdgeProbe | None = None,
+) -> dict[Edge, bool]:
+    """Check many edges for a version, listing each parent prefix once."""
+    probe = probe or EdgeProbe()
+    uris = {edge: edge.build_uri(version) for edge in edges}
+    found = probe.exists(list(uris.values()))
+    return {edge: found[uri] for edge, uri in uris.items()}
 
 
 def make_immutable_dict(
@@ -98,6 +280,7 @@ class Process(BaseModel, frozen=True):
     input_edges: tuple[Edge, ...] = ()
     output_edges: tuple[Edge, ...] = ()
     strip_scheme: bool = False
+    resources: Resources = Resources()
 
     @model_validator(mode="after")
     def validate(self) -> Self:
@@ -107,28 +290,98 @@ class Process(BaseModel, frozen=True):
     def __lt__(self, other):
         return self.node < other.node
 
+    def __hash__(self):
+        # hashing all edges makes every set or dict lookup linear in the
+        # number of edges of the process, the node is enough to tell them apart
+        return hash(self.node)
+
+    def _edge_uri(self, edge: Edge, version: str) -> str:
+        uri = edge.build_uri(version)
+        if self.strip_scheme:
+            return uri.split("://", 1)[1]
+        return uri
+
+    def build_args(self, version: str) -> list[str]:
+        args = list(self.flags)
+        for option, value in self.options:
+            if isinstance(value, Edge):
+                value = self._edge_uri(value, version)
+            args.extend([option, value])
+        args.extend(self._edge_uri(e, version) for e in self.input_edges)
+        args.extend(self._edge_uri(e, version) for e in self.output_edges)
+        return args
+
+
+class GraphIndex:
+    """Hash based adjacency of a set of processes.
+
+    Maps every edge to the processes producing it (``producers``), consuming
+    it as an input edge (``consumers``) and to all processes it is attached to
+    in any way, options included (``attached``).  Graphs are frozen, so each
+    builds its index once and all lookups on it are constant time.
+    """
+
+    def __init__(self, processes: tuple[Process, ...]):
+        self.producers = defaultdict(list)
+        self.consumers = defaultdict(list)
+        self.attached = defaultdict(list)
+        for process in processes:
+            for edge in process.output_edges:
+                self.producers[edge].append(process)
+                self.attached[edge].append(process)
+            for edge in process.input_edges:
+                self.consumers[edge].append(process)
+                self.attached[edge].append(process)
+            for _, edge in process.options:
+                if isinstance(edge, Edge):
+                    self.attached[edge].append(process)
+        # stop lookups from inserting empty entries
+        self.producers.default_factory = None
+        self.consumers.default_factory = None
+        self.attached.default_factory = None
+
+
+class _CachingModel(BaseModel, frozen=True):
+    """Frozen model whose ``cached_property`` values are dropped on copy.
+
+    Cached values live in the instance ``__dict__`` next to the fields, a
+    copy with updated fields must not inherit what was derived from the old
+    ones.
+    """
+
+    def _drop_cached(self) -> Self:
+        for key in self.__dict__.keys() - type(self).model_fields.keys():
+            del self.__dict__[key]
+        return self
 
-class CompiledGraph(BaseModel, frozen=True):
+    def __copy__(self) -> Self:
+        return super().__copy__()._drop_cached()
+
+    def __deepcopy__(self, memo: dict | None = None) -> Self:
+        return super().__deepcopy__(memo)._drop_cached()
+
+
+class CompiledGraph(_CachingModel, frozen=True):
     name: str
     order: Annotated[tuple[Process, ...], UNIQUE_ELEMENTS]
     input_edges: Annotated[tuple[Edge, ...], UNIQUE_ELEMENTS]
+    graph_name: str = ""
+
+    @cached_property
+    def index(self) -> GraphIndex:
+        return GraphIndex(self.order)
 
     def is_disjoint(self, initial_edge: Edge) -> bool:
-        output_edges = defaultdict(list)
-        input_edges = defaultdict(list)
-        for process in self.order:
-            for edge in process.output_edges:
-                output_edges[edge].append(process)
-            for edge in process.input_edges:
-                input_edges[edge].append(process)
+        output_edges = self.index.producers
+        input_edges = self.index.consumers
 
         all_processes = set()
         all_edges = set()
         cur_edges = {initial_edge}
         while cur_edges:  # walk the graph
             cur_processes = set(
-                [p for edge in cur_edges for p in output_edges[edge]]
-                + [p for edge in cur_edges for p in input_edges[edge]]
+                [p for edge in cur_edges for p in output_edges.get(edge, ())]
+                + [p for edge in cur_edges for p in input_edges.get(edge, ())]
             )
             cur_processes -= all_processes
             all_processes |= cur_processes
@@ -141,58 +394,107 @@ class CompiledGraph(BaseModel, frozen=True):
 
         return len(all_processes) != len(self.order)
 
-    def run(self, version: str):
-        # TODO full rework
-        for processes in self.order:
-            for process in self.processes:
-                process.node.run(
-                    version,
-                    [
-                        e.build_uri(version)
-                        for e in process.input_edges + process.output_edges
-                    ],
-                )
+    def dependencies(self) -> dict[Process, set[Process]]:
+        producers = self.index.producers
+        # edges not produced inside the compiled graph are its inputs
+        return {
+            process: {producers[e][0] for e in process.input_edges if e in producers}
+            for process in self.order
+        }
+
+    @cached_property
+    def levels(self) -> tuple[tuple[Process, ...], ...]:
+        """Group processes into levels which can all run at the same time.
+
+        Every process depends only on processes of earlier levels, hence
+        concatenating the levels gives a topological order.
+        """
+        waiting = {p: len(upstream) for p, upstream in self.dependencies().items()}
+        downstream = defaultdict(list)
+        for process, upstream in self.dependencies().items():
+            for parent in upstream:
+                downstream[parent].append(process)
+
+        levels = []
+        level = sorted(p for p, count in waiting.items() if count == 0)
+        while level:
+            levels.append(tuple(level))
+            next_level = []
+            for process in level:
+                for child in downstream[process]:
+                    waiting[child] -= 1
+                    if waiting[child] == 0:
+                        next_level.append(child)
+            level = sorted(next_level)
+        assert sum(map(len, levels)) == len(self.order), "Graph has a cycle"
+        return tuple(levels)
+
+    @property
+    def topological_order(self) -> tuple[Process, ...]:
+        return tuple(p for level in self.levels for p in level)
+
+    def critical_path(
+        self, durations: dict[str, float] | None = None
+    ) -> dict[Process, float]:
+        """Longest time from the start of every process to the end of the graph.
+
+        Paths are weighted by ``durations`` per node name, processes without
+        a duration take the mean of the known ones, or 1 when none is known.
+        """
+        durations = durations or {}
+        known = [durations[p.node.name] for p in self.order if p.node.name in durations]
+        default = sum(known) / len(known) if known else 1.0
+        downstream = defaultdict(list)
+        for process, upstream in self.dependencies().items():
+            for parent in upstream:
+                downstream[parent].append(process)
+
+        lengths = {}
+        for process in reversed(self.topological_order):
+            lengths[process] = durations.get(process.node.name, default) + max(
+                (lengths[child] for child in downstream[process]), default=0
+            )
+        return lengths
+
+    def run(self, version: str, max_concurrency: int | None = None) -> dict[str, int]:
+        return Executor(max_concurrency).run(self, version)
 
+    async def run_async(
+        self, version: str, max_concurrency: int | None = None
+    ) -> dict[str, int]:
+        return await Executor(max_concurrency).run_async(self, version)
 
-class Graph(BaseModel, frozen=True):
+
+class Graph(_CachingModel, frozen=True):
     name: str
     processes: Annotated[tuple[Process, ...], UNIQUE_ELEMENTS]
     edges: Annotated[tuple[Edge, ...], UNIQUE_ELEMENTS]
 
     @model_validator(mode="after")
     def validate(self) -> Self:
-        io_edges = []
-        output_edges = defaultdict(list)
-        for process in self.processes:
-            edges = (
-                list(process.input_edges)
-                + list(process.output_edges)
-                + [e for e in dict(process.options).values() if isinstance(e, Edge)]
-            )
-            for edge in edges:
-                assert edge in self.edges, f"Edge {edge} not found in graph"
-            io_edges.extend(edges)
-
-            for edge in process.output_edges:
-                output_edges[edge].append(process)
-
+        index = self.index
+        edges = set(self.edges)
+        for edge in index.attached:
+            assert edge in edges, f"Edge {edge} not found in graph"
         for edge in self.edges:
-            assert edge in io_edges, f"Edge {edge} not attached to a process"
-        for edge, processes in output_edges.items():
+            assert edge in index.attached, f"Edge {edge} not attached to a process"
+        for edge, processes in index.producers.items():
             assert (
                 len(processes) == 1
             ), f"Output Edge {edge} attached to multiple processes: {processes}"
         inputs, middle, outputs = self.full_io()
         compiled = self.compile_graph("anon", inputs, middle, outputs)
         assert not compiled.is_disjoint(outputs[0]), "Graph cannot be disjoint"
+        compiled.levels  # asserts that there are no cycles
         return self
 
+    @cached_property
+    def index(self) -> GraphIndex:
+        return GraphIndex(self.processes)
+
     def full_io(self) -> tuple[list[Edge], list[Edge], list[Edge]]:
-        process_inputs = []
-        process_outputs = []
-        for process in self.processes:
-            process_inputs.extend(process.input_edges)
-            process_outputs.extend(process.output_edges)
+        process_inputs = self.index.consumers
+        process_outputs = self.index.producers
 
         inputs = [e for e in self.edges if e not in process_outputs]
         middle = [e for e in self.edges if e in process_inputs and e in process_outputs]
@@ -202,32 +504,382 @@ class Graph(BaseModel, frozen=True):
 
         return inputs, middle, outputs
 
+    @cached_property
+    def _compiled(self) -> OrderedDict[tuple, CompiledGraph]:
+        return OrderedDict()
+
     def compile_graph(
         self,
         name: str,
         inputs: list[Edge],
         middle: list[Edge],
         outputs: list[Edge],
-    ) -> tuple[CompiledGraph, list[Edge]]:
-        order = []
-        output_edges = {}  # precompile mapping - we already validated it
-        for process in self.processes:
-            for edge in process.output_edges:
-                output_edges[edge] = process
+    ) -> CompiledGraph:
+        key = (name, frozenset(inputs), frozenset(middle), frozenset(outputs))
+        if key in self._compiled:
+            self._compiled.move_to_end(key)
+            return self._compiled[key]
 
+        output_edges = self.index.producers  # already validated, one producer each
         cur_inputs = set(inputs)
         cur_middle = set(middle)
         cur_outputs = set(outputs)
         assert cur_inputs & cur_middle & cur_outputs == set(), "Edges are not unique"
-        while cur_outputs:
-            new_outputs = set()
-            for edge in cur_outputs:
-                to_run = output_edges[edge]
-                if to_run in order:
-                    # already accountde for due to another output edge
+        # walk back from the outputs, stopping at edges which are not middle
+        order = set()
+        to_visit = [output_edges[edge][0] for edge in cur_outputs]
+        while to_visit:
+            to_run = to_visit.pop()
+            if to_run in order:
+                continue
+            order.add(to_run)
+            to_visit.extend(
+                output_edges[edge][0]
+                for edge in to_run.input_edges
+                if edge in cur_middle
+            )
+        compiled = CompiledGraph(
+            name=name,
+            order=order,
+            input_edges=inputs,
+            graph_name=self.name,
+        )
+        self._compiled[key] = compiled
+        if len(self._compiled) > COMPILED_CACHE_SIZE:
+            self._compiled.popitem(last=False)
+        return compiled
+
+    def compile_upstream(
+        self,
+        name: str,
+        outputs: list[Edge],
+        version: str | None = None,
+        probe: EdgeProbe | None = None,
+        stale: list[Edge] = (),
+    ) -> CompiledGraph:
+        """Compile only what is needed to produce ``outputs``.
+
+        Walks back from ``outputs``, and when a ``version`` is given every
+        intermediate edge that already exists for it becomes an input of the
+        compiled graph, cutting off everything upstream of it.  Edges in
+        ``stale`` are produced again even if they exist.
+        """
+        producers = self.index.producers
+        probe = probe or EdgeProbe()
+        stale = set(stale)
+        cur_outputs = set(outputs)
+        inputs = set()
+        middle = set()
+        visited = set()
+        for edge in cur_outputs:
+            assert edge in producers, f"Edge {edge} is not produced by any process"
+        to_visit = [producers[edge][0] for edge in cur_outputs]
+        while to_visit:  # one batch of existence checks per step back
+            new_edges = set()
+            for process in to_visit:
+                if process in visited:
+                    continue
+                visited.add(process)
+                new_edges.update(process.input_edges)
+            new_edges -= inputs | middle | cur_outputs
+            existing = {}
+            if version is not None:
+                existing = edges_exist(
+                    [e for e in new_edges if e in producers and e not in stale],
+                    version,
+                    probe,
+                )
+            to_visit = []
+            for edge in new_edges:
+                if edge not in producers or existing.get(edge, False):
+                    inputs.add(edge)
+                else:
+                    middle.add(edge)
+                    to_visit.append(producers[edge][0])
+        return self.compile_graph(name, sorted(inputs), sorted(middle), sorted(outputs))
+
+    def compile_resume(
+        self,
+        name: str,
+        compiled: CompiledGraph,
+        version: str,
+        failed: list[str] = (),
+        probe: EdgeProbe | None = None,
+    ) -> CompiledGraph:
+        """Compile what is left to run of ``compiled`` for ``version``.
+
+        Outputs that already exist are not produced again and neither is
+        anything upstream of existing edges.  The processes named in
+        ``failed`` may have left partial outputs behind, these are produced
+        again regardless.
+        """
+        probe = probe or EdgeProbe()
+        index = compiled.index
+        outputs = [e for e in index.producers if e not in index.consumers]
+        failed = set(failed)
+        stale = [
+            edge
+            for process in compiled.order
+            if process.node.name in failed
+            for edge in process.output_edges
+        ]
+        existing = edges_exist(outputs, version, probe)
+        missing = [e for e in outputs if e in stale or not existing[e]]
+        return self.compile_upstream(name, missing, version, probe, stale)
+
+
+class _Schedule:
+    """Track which processes of a compiled graph are ready to run.
+
+    Ready processes are kept longest remaining path first.
+    """
+
+    def __init__(
+        self,
+        compiled: CompiledGraph,
+        version: str,
+        manifest_provider: ManifestProvider | None = None,
+        journal: RunningJournal | None = None,
+        durations: dict[str, float] | None = None,
+    ):
+        self.compiled = compiled
+        self.version = version
+        self.waiting = compiled.dependencies()
+        self.downstream = defaultdict(list)
+        for process, upstream in self.waiting.items():
+            for parent in upstream:
+                self.downstream[parent].append(process)
+        self.priority = compiled.critical_path(durations)
+        self.ready = sorted(
+            (p for p, upstream in self.waiting.items() if not upstream),
+            key=self._key,
+        )
+        self.return_codes = {}
+        self.skipped = set()
+        self.started = {}
+        self.records = []
+        self.manifest_provider = manifest_provider
+        self.manifest = None
+        if manifest_provider is not None:
+            self.manifest = manifest_provider.read(version)
+        self.journal = journal
+
+    def _key(self, process: Process) -> tuple[float, Process]:
+        return -self.priority[process], process
+
+    def _journal(self, process: Process, status: str, **event: Any):
+        if self.journal is None:
+            return
+        self.journal.append(
+            self.compiled.graph_name,
+            self.compiled.name,
+            self.version,
+            [
+                RunEvent(
+                    process=process.node.name,
+                    status=status,
+                    at=datetime.now(UTC),
+                    **event,
+                )
+            ],
+        )
+
+    def pop(self, pool: ResourcePool | None = None) -> Process | None:
+        """Next process to run, processes which are up to date finish at once.
+
+        With a ``pool`` only processes fitting in it are considered.  Among
+        processes on equally long paths those requesting the largest share of
+        it go first (first fit decreasing).
+        """
+        while self.ready:
+            candidates = range(len(self.ready))
+            if pool is not None:
+                candidates = sorted(
+                    (i for i in candidates if pool.fits(self.ready[i].resources)),
+                    key=lambda i: (
+                        -self.priority[self.ready[i]],
+                        -pool.share(self.ready[i].resources),
+                    ),
+                )
+            if not candidates:
+                return None
+            process = self.ready.pop(candidates[0])
+            self.started[process] = datetime.now(UTC)
+            if self.manifest is None or not self.manifest_provider.up_to_date(
+                self.manifest, process, self.version
+            ):
+                self._journal(process, "started")
+                return process
+            self.skipped.add(process.node.name)
+            self.finish(process, 0)
+        return None
+
+    def _record(self, process: Process, return_code: int):
+        if process.node.name in self.skipped:
+            status = "skipped"
+        elif return_code == 0:
+            status = "success"
+        else:
+            status = "failed"
+        self.records.append(
+            {
+                "graph": self.compiled.graph_name,
+                "compiled": self.compiled.name,
+                "version": self.version,
+                "process": process.node.name,
+                "status": status,
+                "start": self.started[process],
+                "end": datetime.now(UTC),
+                "exit_code": return_code,
+            }
+        )
+        edges = ()
+        if return_code == 0:
+            edges = tuple(e.build_uri(self.version) for e in process.output_edges)
+        self._journal(process, status, exit_code=return_code, edges=edges)
+
+    def finish(self, process: Process, return_code: int):
+        self.return_codes[process.node.name] = return_code
+        self._record(process, return_code)
+        if return_code != 0:
+            return
+        if self.manifest is not None and process.node.name not in self.skipped:
+            self.manifest_provider.record(self.manifest, process, self.version)
+        for child in self.downstream[process]:
+            self.waiting[child].discard(process)
+            if not self.waiting[child]:
+                self.ready.append(child)
+        self.ready.sort(key=self._key)
+
+
+class Executor:
+    """Run processes of a compiled graph as soon as their inputs are ready.
+
+    Processes downstream of a failure never start.  At most
+    ``max_concurrency`` processes run at once (one per CPU by default),
+    within the resources of ``capacity`` (this machine by default).  Ready
+    processes on the longest path, weighted by ``durations`` or the mean run
+    times in the ``ledger``, start first.  ``manifest_provider`` skips
+    processes which are up to date, ``ledger`` and ``journal`` record runs.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int | None = None,
+        manifest_provider: ManifestProvider | None = None,
+        ledger: RunLedger | None = None,
+        journal: RunningJournal | None = None,
+        capacity: Resources | None = None,
+        durations: dict[str, float] | None = None,
+    ):
+        if max_concurrency is None:
+            max_concurrency = os.cpu_count() or 1
+        assert max_concurrency > 0, "Concurrency must be positive"
+        self.max_concurrency = max_concurrency
+        self.manifest_provider = manifest_provider
+        self.ledger = ledger
+        self.journal = journal
+        self.capacity = capacity or detect_capacity()
+        self.durations = durations
+
+    def _schedule(self, compiled: CompiledGraph, version: str) -> _Schedule:
+        durations = self.durations
+        if durations is None and self.ledger is not None:
+            durations = mean_durations(
+                self.ledger.scan(graph_name=compiled.graph_name, status="success")
+            )
+        return _Schedule(
+            compiled, version, self.manifest_provider, self.journal, durations
+        )
+
+    def _done(self, schedule: _Schedule):
+        if self.ledger is not None:
+            self.ledger.append(schedule.records)
+
+    def run(self, compiled: CompiledGraph, version: str) -> dict[str, int]:
+        schedule = self._schedule(compiled, version)
+        running = {}
+        # exited, their log is closed once their output was captured
+        closing = []
+        pool = ResourcePool(self.capacity)
+        supervisor = Supervisor()
+        try:
+            while schedule.ready or running:
+                while schedule.ready and len(running) < self.max_concurrency:
+                    process = schedule.pop(pool)
+                    if process is None:
+                        break
+                    try:
+                        nm = process.node.run(version, process.build_args(version))
+                    except OSError:
+                        schedule.finish(process, SPAWN_FAILED)
+                        continue
+                    running[nm] = process
+                    pool.acquire(process.resources)
+                    supervisor.register(nm)
+
+                for nm in supervisor.wait():
+                    process = running.pop(nm)
+                    pool.release(process.resources)
+                    return_code = process.node.heartbeat(nm, version)
+                    closing.append(nm)
+                    schedule.finish(process, return_code)
+                closing = _close_drained(closing)
+        finally:
+            # only left running when interrupted, do not leave orphans behind
+            for nm, process in running.items():
+                if nm.poll() is None:
+                    nm.meta.kill()
+                return_code = nm.wait()
+                closing.append(nm)
+                schedule.finish(process, return_code)
+            _close_all(closing, NodeMetadata.drain_timeout)
+            supervisor.close()
+            self._done(schedule)
+        return schedule.return_codes
+
+    async def run_async(self, compiled: CompiledGraph, version: str) -> dict[str, int]:
+        schedule = self._schedule(compiled, version)
+        running = {}
+        closing = []
+        pool = ResourcePool(self.capacity)
+        try:
+            while schedule.ready or running:
+                while schedule.ready and len(running) < self.max_concurrency:
+                    process = schedule.pop(pool)
+                    if process is None:
+                        break
+                    try:
+                        nm = await process.node.run_async(
+                            version, process.build_args(version)
+                        )
+                    except OSError:
+                        schedule.finish(process, SPAWN_FAILED)
+                        continue
+                    task = asyncio.create_task(process.node.wait_async(nm))
+                    running[task] = (process, nm)
+                    pool.acquire(process.resources)
+
+                if not running:
                     continue
-                order.append(to_run)
-                required = set(to_run.input_edges) & cur_middle
-                new_outputs |= required
-            cur_outputs = new_outputs
-        return CompiledGraph(name=name, order=order, input_edges=inputs)
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in sorted(done, key=lambda t: running[t][0]):
+                    process, nm = running.pop(task)
+                    pool.release(process.resources)
+                    closing.append(nm)
+                    schedule.finish(process, task.result())
+                closing = await asyncio.to_thread(_close_drained, closing)
+        finally:
+            for task, (process, nm) in running.items():
+                task.cancel()
+                if nm.meta.returncode is None:
+                    nm.meta.kill()
+                return_code = await nm.meta.wait()
+                nm._exited()
+                closing.append(nm)
+                schedule.finish(process, return_code)
+            await asyncio.to_thread(_close_all, closing, NodeMetadata.drain_timeout)
+            self._done(schedule)
+        return schedule.return_codes
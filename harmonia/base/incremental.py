@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+from typing import TYPE_CHECKING, Annotated
+
+import smart_open
+from pydantic import BaseModel
+
+from harmonia.base.validators import SCHEME, VERSION, makedirs
+
+if TYPE_CHECKING:
+    from harmonia.base.graph import Process
+
+HASH_CHUNK = 1 << 20
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _describe_path(path: str, content_hash: bool) -> list[tuple]:
+    if not os.path.isdir(path):
+        stat = os.stat(path)
+        if content_hash:
+            return [("", stat.st_size, _hash_file(path))]
+        return [("", stat.st_size, stat.st_mtime_ns)]
+
+    described = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            full_path = os.path.join(root, name)
+            relative = os.path.relpath(full_path, path)
+            described.extend(
+                (relative, size, marker)
+                for _, size, marker in _describe_path(full_path, content_hash)
+            )
+    return described
+
+
+def fingerprint_uri(uri: str, content_hash: bool = False) -> str | None:
+    """Fingerprint the data behind a URI, ``None`` when it cannot be told.
+
+    Local files are fingerprinted by size and modification time, or by their
+    content when ``content_hash`` is set, directories by all files within.
+    Missing and remote data cannot be fingerprinted.
+    """
+    if not uri.startswith("file://"):
+        return None
+    try:
+        described = _describe_path(uri[len("file://") :], content_hash)
+    except FileNotFoundError:
+        return None
+    return hashlib.sha256(json.dumps(described).encode()).hexdigest()
+
+
+class ProcessFingerprint(BaseModel, frozen=True):
+    inputs: str
+    outputs: str
+
+
+class Manifest(BaseModel):
+    processes: dict[str, ProcessFingerprint] = {}
+
+
+class ManifestProvider(BaseModel, frozen=True):
+    """Store fingerprints of processes that finished successfully.
+
+    A process whose definition, input edges and output edges still match the
+    fingerprint recorded for the same version does not need to run again.
+    """
+
+    uri: Annotated[str, VERSION, SCHEME] = "file://./state/manifest/{version}.json"
+    content_hash: bool = False
+
+    def read(self, version: str) -> Manifest:
+        try:
+            with smart_open.open(self.uri.format(version=version)) as f:
+                return Manifest.model_validate_json(f.read())
+        except (OSError, ValueError):
+            # a missing or unreadable manifest only means running everything
+            return Manifest()
+
+    def write(self, version: str, manifest: Manifest):
+        uri = self.uri.format(version=version)
+        makedirs(uri)
+        with smart_open.open(uri, "w") as f:
+            f.write(manifest.model_dump_json(indent=2))
+
+    def _fingerprint_edges(self, uris: list[str]) -> str | None:
+        fingerprints = [fingerprint_uri(uri, self.content_hash) for uri in uris]
+        if None in fingerprints:
+            return None
+        return hashlib.sha256(json.dumps(fingerprints).encode()).hexdigest()
+
+    def fingerprint(
+        self, process: "Process", version: str
+    ) -> ProcessFingerprint | None:
+        option_edges = [
+            value.build_uri(version)
+            for _, value in process.options
+            if not isinstance(value, str)
+        ]
+        inputs = self._fingerprint_edges(
+            [e.build_uri(version) for e in process.input_edges] + option_edges
+        )
+        outputs = self._fingerprint_edges(
+            [e.build_uri(version) for e in process.output_edges]
+        )
+        if inputs is None or outputs is None:
+            return None
+        definition = json.dumps(
+            [
+                process.node.cmd,
+                process.build_args(version),
+                inputs,
+            ]
+        )
+        return ProcessFingerprint(
+            inputs=hashlib.sha256(definition.encode()).hexdigest(),
+            outputs=outputs,
+        )
+
+    def up_to_date(self, manifest: Manifest, process: "Process", version: str) -> bool:
+        recorded = manifest.processes.get(process.node.name)
+        if recorded is None:
+            return False
+        return recorded == self.fingerprint(process, version)
+
+    def record(self, manifest: Manifest, process: "Process", version: str):
+        fingerprint = self.fingerprint(process, version)
+        if fingerprint is None:
+            manifest.processes.pop(process.node.name, None)
+        else:
+            manifest.processes[process.node.name] = fingerprint
+        self.write(version, manifest)
@@ -0,0 +1,85 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import TYPE_CHECKING, Literal
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from harmonia.base.state import StateProvider
+
+
+class RunEvent(BaseModel, frozen=True):
+    """A single change of the running state of a version."""
+
+    process: str
+    status: Literal["started", "success", "failed", "skipped"]
+    at: datetime
+    exit_code: int | None = None
+    # output URIs materialised by the process
+    edges: tuple[str, ...] = ()
+
+
+class RunningState(BaseModel):
+    """Running state of a version, built by replaying its events.
+
+    Replaying an event twice changes nothing, hence a snapshot followed by
+    events it already holds replays to the same state.
+    """
+
+    processes: dict[str, str] = {}
+    exit_codes: dict[str, int] = {}
+    edges: set[str] = set()
+
+    def apply(self, event: RunEvent):
+        self.processes[event.process] = event.status
+        if event.exit_code is not None:
+            self.exit_codes[event.process] = event.exit_code
+        self.edges.update(event.edges)
+
+    def with_status(self, status: str) -> list[str]:
+        return sorted(p for p, s in self.processes.items() if s == status)
+
+
+def replay(lines: str, state: RunningState | None = None) -> RunningState:
+    """Apply newline terminated events to ``state``.
+
+    A trailing line without newline was cut short by a crashed writer and is
+    ignored.
+    """
+    state = state or RunningState()
+    for line in lines.split("\n")[:-1]:
+        if line:
+            state.apply(RunEvent.model_validate_json(line))
+    return state
+
+
+class RunningJournal:
+    """Append running state events through a state provider.
+
+    Every update costs one append of the events themselves instead of a
+    rewrite of the whole running state.  Once ``compact_every`` events were
+    appended for a version its journal is folded into a snapshot.  A version
+    is expected to be journaled by a single executor at a time.
+    """
+
+    def __init__(self, provider: "StateProvider", compact_every: int = 1000):
+        assert compact_every > 0, "Compaction interval must be positive"
+        self.provider = provider
+        self.compact_every = compact_every
+        self._appended = defaultdict(int)
+
+    def append(
+        self,
+        graph_name: str,
+        compiled_name: str,
+        version: str,
+        events: list[RunEvent],
+    ):
+        if not events:
+            return
+        self.provider.append_events(graph_name, compiled_name, version, events)
+        key = (graph_name, compiled_name, version)
+        self._appended[key] += len(events)
+        if self._appended[key] >= self.compact_every:
+            self.provider.compact_running(*key)
+            self._appended[key] = 0
@@ -0,0 +1,132 @@
+import time
+import uuid
+from datetime import datetime
+from typing import Annotated
+from urllib.parse import quote
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+from pydantic import BaseModel
+
+from harmonia.base.filesystem import FILESYSTEMS
+from harmonia.base.validators import SCHEME
+
+RUN_SCHEMA = pa.schema(
+    [
+        ("graph", pa.string()),
+        ("compiled", pa.string()),
+        ("version", pa.string()),
+        ("process", pa.string()),
+        ("status", pa.string()),
+        ("start", pa.timestamp("us", tz="UTC")),
+        ("end", pa.timestamp("us", tz="UTC")),
+        ("exit_code", pa.int64()),
+    ]
+)
+# the graph name lives in the directory of each part
+PARTITIONING = ds.partitioning(pa.schema([("graph", pa.string())]), flavor="hive")
+
+
+def mean_durations(runs: pa.Table) -> dict[str, float]:
+    """Mean wall time in seconds of every process in ``runs``."""
+    elapsed = pc.subtract(runs["end"], runs["start"]).cast(pa.int64())
+    table = pa.table({"process": runs["process"], "elapsed": elapsed})
+    means = table.group_by("process").aggregate([("elapsed", "mean")])
+    return {
+        process: mean / 1e6
+        for process, mean in zip(
+            means["process"].to_pylist(), means["elapsed_mean"].to_pylist()
+        )
+    }
+
+
+class RunLedger(BaseModel, frozen=True):
+    """Append-only record of process runs stored as Parquet.
+
+    Every append writes a new part file under a ``graph=<name>`` directory,
+    so scans filtered by graph only open that graph's parts and other filters
+    are pushed down to the Parquet row groups.  ``compact`` merges the parts
+    of a graph once they pile up.
+    """
+
+    uri: Annotated[str, SCHEME] = "file://./state/ledger/"
+
+    def _filesystem(self) -> tuple[fs.FileSystem, str]:
+        resolved = FILESYSTEMS.resolve(self.uri)
+        if resolved is None:
+            raise ValueError(f"No filesystem for URI {self.uri}")
+        return resolved
+
+    def append(self, records: list[dict]):
+        if not records:
+            return
+        filesystem, root = self._filesystem()
+        by_graph = {}
+        for record in records:
+            by_graph.setdefault(record["graph"], []).append(record)
+        for graph_name, graph_records in by_graph.items():
+            directory = f"{root}/graph={quote(graph_name, safe='')}"
+            filesystem.create_dir(directory)
+            table = pa.Table.from_pylist(graph_records, schema=RUN_SCHEMA)
+            table = table.drop_columns(["graph"])
+            part = f"part-{time.time_ns()}-{uuid.uuid4().hex}.parquet"
+            pq.write_table(table, f"{directory}/{part}", filesystem=filesystem)
+
+    def _dataset(self) -> ds.Dataset | None:
+        filesystem, root = self._filesystem()
+        if filesystem.get_file_info(root).type == fs.FileType.NotFound:
+            return None
+        return ds.dataset(
+            root,
+            schema=RUN_SCHEMA,
+            format="parquet",
+            filesystem=filesystem,
+            partitioning=PARTITIONING,
+        )
+
+    def scan(
+        self,
+        graph_name: str | None = None,
+        compiled_name: str | None = None,
+        version: str | None = None,
+        process: str | None = None,
+        status: str | None = None,
+        since: datetime | None = None,
+    ) -> pa.Table:
+        """Return the recorded runs matching every filter given."""
+        dataset = self._dataset()
+        if dataset is None:
+            return RUN_SCHEMA.empty_table()
+
+        expression = None
+        for column, value in [
+            ("graph", graph_name),
+            ("compiled", compiled_name),
+            ("version", version),
+            ("process", process),
+            ("status", status),
+        ]:
+            if value is None:
+                continue
+            condition = ds.field(column) == value
+            expression = condition if expression is None else expression & condition
+        if since is not None:
+            condition = ds.field("start") >= pa.scalar(
+                since, RUN_SCHEMA.field("start").type
+            )
+            expression = condition if expression is None else expression & condition
+        return dataset.to_table(filter=expression).select(RUN_SCHEMA.names)
+
+    def compact(self, graph_name: str):
+        """Merge all parts of a graph into a single part."""
+        runs = self.scan(graph_name=graph_name)
+        filesystem, root = self._filesystem()
+        directory = f"{root}/graph={quote(graph_name, safe='')}"
+        selector = fs.FileSelector(directory, allow_not_found=True)
+        old_parts = [info.path for info in filesystem.get_file_info(selector)]
+        self.append(runs.to_pylist())
+        for path in old_parts:
+            filesystem.delete_file(path)
@@ -1,49 +1,272 @@
+import json
+import os
+import posixpath
+import re
 import sys
+import threading
+import time
+import weakref
 from collections import defaultdict
 from datetime import UTC, datetime
 from io import StringIO
 from typing import Annotated
 
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import smart_open
+from pyarrow import fs
 from pydantic import BaseModel
+from smart_open import compression
 
+from harmonia.base.filesystem import FILESYSTEMS
 from harmonia.base.validators import NAME, SCHEME, VERSION, makedirs
 
 
+FLUSH_SIZE = 1 << 16
+FLUSH_INTERVAL = 1.0
+COMPRESSED_EXTENSIONS = set(compression.get_supported_extensions())
+
+_second_cache = (None, "")
+
+
+def timestamp() -> str:
+    """Current UTC time, formatting the date part once per second."""
+    global _second_cache
+    now = time.time_ns()
+    second, micros = divmod(now // 1000, 1_000_000)
+    cached_second, prefix = _second_cache
+    if cached_second != second:
+        prefix = datetime.fromtimestamp(second, UTC).strftime("%Y-%m-%d %H:%M:%S")
+        _second_cache = (second, prefix)
+    return f"{prefix}.{micros:06d}+00:00"
+
+
+class BufferedWriter:
+    """Batch lines in memory and write them to a handle from a thread.
+
+    Lines are written once ``flush_size`` characters are pending or
+    ``flush_interval`` seconds passed, whichever comes first, and everything
+    left is written on ``close``.  A batch the handle failed to take is kept
+    and retried on the next flush, meanwhile ``write`` and ``close`` raise
+    the error.
+    """
+
+    def __init__(
+        self,
+        handle,
+        flush_size: int = FLUSH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+    ):
+        self.handle = handle
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._lines = []
+        self._pending = 0
+        self._closed = False
+        self._error: Exception | None = None
+        self._wakeup = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, line: str):
+        with self._wakeup:
+            assert not self._closed, "Writer is closed"
+            if self._error is not None:
+                raise self._error
+            self._lines.append(line)
+            self._pending += len(line)
+            if self._pending >= self.flush_size:
+                self._wakeup.notify()
+
+    def _take(self) -> list[str]:
+        lines, self._lines, self._pending = self._lines, [], 0
+        return lines
+
+    def _run(self):
+        unwritten = ""
+        while True:
+            with self._wakeup:
+                if not self._closed and self._pending < self.flush_size:
+                    self._wakeup.wait(self.flush_interval)
+                closed = self._closed
+                unwritten += "".join(self._take())
+            if unwritten or self._error is not None:
+                error = None
+                try:
+                    if unwritten:
+                        self.handle.write(unwritten)
+                        unwritten = ""
+                    self.handle.flush()
+                except Exception as exc:
+                    error = exc
+                with self._wakeup:
+                    self._error = error
+            if closed:
+                return
+
+    def close(self):
+        with self._wakeup:
+            if self._closed:
+                return
+            self._closed = True
+            self._wakeup.notify()
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+
+def segment_uri(uri: str, segment: int) -> str:
+    """URI of a rotated segment, ``x.log.gz`` becomes ``x.log.1.gz``."""
+    stem, dot, extension = uri.rpartition(".")
+    if dot and f".{extension}" in COMPRESSED_EXTENSIONS:
+        return f"{stem}.{segment}.{extension}"
+    return f"{uri}.{segment}"
+
+
+class RotatingHandle:
+    """Text handle on a local log file which rotates it as it grows old or big.
+
+    Once ``max_bytes`` bytes were written to the current file, or it is
+    older than ``max_age`` seconds, it becomes segment 1, segment 1 becomes
+    segment 2 and so on, and segments beyond ``keep`` are deleted.
+    Compression follows the extension of the URI and applies to every
+    segment.
+    """
+
+    def __init__(
+        self,
+        uri: str,
+        max_bytes: int | None = None,
+        max_age: float | None = None,
+        keep: int = 5,
+    ):
+        if not uri.startswith("file://"):
+            raise ValueError("Only local logs can be rotated")
+        assert keep > 0, "At least one rotated segment must be kept"
+        self.path = uri[len("file://") :]
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.keep = keep
+        self._open()
+
+    def _open(self):
+        self._handle = smart_open.open(self.path, "w")
+        self._written = 0
+        self._opened = time.monotonic()
+
+    def _rotate(self):
+        self._handle.close()
+        oldest = segment_uri(self.path, self.keep)
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for segment in range(self.keep - 1, 0, -1):
+            path = segment_uri(self.path, segment)
+            if os.path.exists(path):
+                os.rename(path, segment_uri(self.path, segment + 1))
+        os.rename(self.path, segment_uri(self.path, 1))
+        self._open()
+
+    def write(self, text: str):
+        too_big = self.max_bytes is not None and self._written >= self.max_bytes
+        too_old = (
+            self.max_age is not None and time.monotonic() - self._opened >= self.max_age
+        )
+        if self._written and (too_big or too_old):
+            self._rotate()
+        self._handle.write(text)
+        # counted encoded, before any compression
+        self._written += len(text.encode())
+
+    def flush(self):
+        self._handle.flush()
+
+    def close(self):
+        self._handle.close()
+
+
 class LogProvider:
-    def __init__(self, uri: str = "-", handle_stdout: bool = False):
+    """Write timestamped lines to a URI, or to stdout for ``-``.
+
+    URIs ending in a compression extension (``.gz``, ``.zst``, ...) are
+    compressed as they are written.  Local logs are rotated after
+    ``max_bytes`` bytes or ``max_age`` seconds, keeping ``keep`` old
+    segments.  With ``buffered`` set lines are handed to a background thread
+    which writes them in batches, so ``msg`` never waits on the log store.
+    """
+
+    _writer = None
+
+    def __init__(
+        self,
+        uri: str = "-",
+        buffered: bool = False,
+        flush_size: int = FLUSH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_bytes: int | None = None,
+        max_age: float | None = None,
+        keep: int = 5,
+    ):
         self.handle = None
         if uri == "-":
             self.handle = sys.stdout
-            return
-
-        if "://" not in uri:
-            raise ValueError("URI must contain a protocol")
-        makedirs(uri)
-        self.handle = smart_open.open(uri, "w")
-        # this can be dangerous, only used by the log factory
-        if handle_stdout:
-            sys.stdout = self.handle
-            sys.stderr = self.handle
+        else:
+            if "://" not in uri:
+                raise ValueError("URI must contain a protocol")
+            makedirs(uri)
+            if max_bytes is None and max_age is None:
+                self.handle = smart_open.open(uri, "w")
+            else:
+                self.handle = RotatingHandle(uri, max_bytes, max_age, keep)
+
+        if buffered:
+            self._writer = BufferedWriter(self.handle, flush_size, flush_interval)
+            # also flushes at interpreter exit, when __del__ may never run
+            self._finalizer = weakref.finalize(
+                self, _close_buffered, self._writer, uri != "-"
+            )
+
+    def write(self, text: str):
+        if self._writer is not None:
+            self._writer.write(text)
+        else:
+            self.handle.write(text)
 
     def msg(self, msg: str):
-        self.handle.write(f"{datetime.now(UTC)} | {msg}\n")
+        self.write(f"{timestamp()} | {msg}\n")
 
     def close(self):
-        if self.handle is not None:
+        if self._writer is not None:
+            self._finalizer()
+        elif self.handle is not None:
             self.handle.close()
 
     def __del__(self):
         self.close()
 
 
+def _close_buffered(writer: BufferedWriter, close_handle: bool):
+    try:
+        writer.close()
+    finally:
+        if close_handle:
+            writer.handle.close()
+
+
 class LogProviderFactory(BaseModel, frozen=True):
     uri: Annotated[str, NAME, VERSION, SCHEME] = "file://./logs/{version}/{name}.log"
+    buffered: bool = False
+    max_bytes: int | None = None
+    max_age: float | None = None
+    keep: int = 5
 
     def build(self, version: str, name: str) -> LogProvider:
         return LogProvider(
             self.uri.format(version=version, name=name),
-            handle_stdout=True,
+            buffered=self.buffered,
+            max_bytes=self.max_bytes,
+            max_age=self.max_age,
+            keep=self.keep,
         )
 
 
@@ -107,7 +330,265 @@ class MetricProvider:
         return self._metrics[metric]
 
 
+METRIC_SCHEMA = pa.schema(
+    [
+        ("metric", pa.string()),
+        ("step", pa.int64()),
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("value", pa.float64()),
+    ]
+)
+SCANNED_METRIC_SCHEMA = pa.schema(
+    [("version", pa.string()), ("name", pa.string()), *METRIC_SCHEMA]
+)
+METRIC_BATCH_SIZE = 10_000
+STREAMING_EXTENSIONS = (".parquet", ".arrow")
+
+
+def _aggregate(batch: pa.RecordBatch) -> dict[str, tuple]:
+    table = (
+        pa.Table.from_batches([batch])
+        .group_by("metric", use_threads=False)
+        .aggregate(
+            [
+                ("value", "min"),
+                ("value", "max"),
+                ("value", "sum"),
+                ("value", "count"),
+                ("value", "last"),
+            ]
+        )
+    )
+    columns = ["value_min", "value_max", "value_sum", "value_count", "value_last"]
+    return dict(
+        zip(
+            table["metric"].to_pylist(),
+            zip(*(table[c].to_pylist() for c in columns)),
+        )
+    )
+
+
+def _merge(stats: dict[str, tuple], new: dict[str, tuple]):
+    for metric, (low, high, total, count, last) in new.items():
+        if metric in stats:
+            old_low, old_high, old_total, old_count, _ = stats[metric]
+            low, high = min(low, old_low), max(high, old_high)
+            total, count = total + old_total, count + old_count
+        stats[metric] = (low, high, total, count, last)
+
+
+class StreamingMetricProvider(MetricProvider):
+    """Stream metrics to an Arrow IPC (``.arrow``) or Parquet file.
+
+    Values are collected in columns and appended as one record batch every
+    ``batch_size`` values, hence memory stays bounded however many steps are
+    logged and ``get_metric`` reads flushed values back from the file.  An
+    IPC stream can be read up to its last batch even after a crash, a
+    Parquet file only once closed.  Params are stored in the file metadata,
+    with IPC they must be logged before the first batch is written.
+    """
+
+    # nothing to close until construction succeeded
+    _closed = True
+
+    def __init__(
+        self,
+        uri: str,
+        log_provider: LogProvider | None = None,
+        batch_size: int = METRIC_BATCH_SIZE,
+    ):
+        self.log_provider = log_provider
+        if "://" not in uri:
+            raise ValueError("URI must contain a protocol")
+        if not uri.endswith(STREAMING_EXTENSIONS):
+            raise ValueError(f"URI must end with one of {STREAMING_EXTENSIONS}")
+        assert batch_size > 0, "Batch size must be positive"
+        self.uri = uri
+        self.batch_size = batch_size
+        self._params = {}
+        self.params = self._params
+        self._steps = defaultdict(int)
+        self._columns = ([], [], [], [])
+        self._stats = {}
+        self.handle = None
+        self._writer = None
+        self._closed = False
+
+    def _open(self):
+        makedirs(self.uri)
+        self.handle = smart_open.open(self.uri, "wb")
+        schema = METRIC_SCHEMA.with_metadata({"params": json.dumps(self._params)})
+        if self.uri.endswith(".parquet"):
+            self._writer = pq.ParquetWriter(self.handle, schema)
+        else:
+            self._writer = pa.ipc.new_stream(self.handle, schema)
+
+    def _pending(self) -> pa.RecordBatch:
+        return pa.RecordBatch.from_arrays(
+            [pa.array(c, f.type) for c, f in zip(self._columns, METRIC_SCHEMA)],
+            schema=METRIC_SCHEMA,
+        )
+
+    def flush(self):
+        """Append the values logged since the last batch to the file."""
+        if self._writer is None:
+            self._open()
+        if not self._columns[0]:
+            return
+        batch = self._pending()
+        self._writer.write_batch(batch)
+        _merge(self._stats, _aggregate(batch))
+        self._columns = ([], [], [], [])
+
+    def log_param(self, param: str, value: str):
+        assert self._writer is None or self.uri.endswith(".parquet"), (
+            "Params of an IPC stream must be logged before the first batch"
+        )
+        super().log_param(param, value)
+
+    def log_metric(self, metric: str, value: float, step: int | None = None):
+        if step is None:
+            step = self._steps[metric]
+        self._steps[metric] = step + 1
+        metrics, steps, timestamps, values = self._columns
+        metrics.append(metric)
+        steps.append(step)
+        timestamps.append(time.time_ns() // 1000)
+        values.append(value)
+        if len(values) >= self.batch_size:
+            self.flush()
+        if self.log_provider is not None:
+            self.log_provider.msg(f"metric: {metric} = {value:.4f}")
+
+    def _logged(self, metrics: list[str] | None = None) -> pa.Table:
+        """Values flushed to the file followed by the pending ones."""
+        pending = pa.Table.from_batches([self._pending()])
+        if metrics is not None:
+            pending = pending.filter(
+                pc.is_in(pending["metric"], pa.array(metrics, pa.string()))
+            )
+        if not self._stats:
+            return pending
+        assert self._closed or (
+            self.uri.startswith("file://") and self.uri.endswith(".arrow")
+        ), "Only local IPC streams can be read back before they are closed"
+        if not self._closed:
+            self.handle.flush()
+        flushed = read_metrics(self.uri, metrics).replace_schema_metadata()
+        return pa.concat_tables([flushed, pending])
+
+    def get_metric(self, metric: str) -> list[float]:
+        return self._logged([metric])["value"].to_pylist()
+
+    @property
+    def metrics(self) -> dict[str, list[float]]:
+        table = self._logged()
+        metrics = defaultdict(list)
+        for metric, value in zip(
+            table["metric"].to_pylist(), table["value"].to_pylist()
+        ):
+            metrics[metric].append(value)
+        return metrics
+
+    def summary(self) -> pa.Table:
+        """Min, max, mean, last value and count of every metric so far."""
+        stats = dict(self._stats)
+        if self._columns[0]:
+            _merge(stats, _aggregate(self._pending()))
+        metrics = sorted(stats)
+        low = high = total = count = last = ()
+        if stats:
+            low, high, total, count, last = zip(*(stats[m] for m in metrics))
+        return pa.table(
+            {
+                "metric": pa.array(metrics, pa.string()),
+                "min": pa.array(low, pa.float64()),
+                "max": pa.array(high, pa.float64()),
+                "mean": pa.array([t / c for t, c in zip(total, count)], pa.float64()),
+                "last": pa.array(last, pa.float64()),
+                "count": pa.array(count, pa.int64()),
+            }
+        )
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self.flush()
+        if self.uri.endswith(".parquet"):
+            self._writer.add_key_value_metadata({"params": json.dumps(self._params)})
+        self._writer.close()
+        self.handle.close()
+
+
+def read_metrics(uri: str, metrics: list[str] | None = None) -> pa.Table:
+    """Read a streamed metric file, params are in the schema metadata.
+
+    An IPC stream cut short by a crash reads up to its last complete batch.
+    """
+    with smart_open.open(uri, "rb") as f:
+        if uri.endswith(".parquet"):
+            filters = None if metrics is None else [("metric", "in", metrics)]
+            return pq.read_table(f, filters=filters)
+        reader = pa.ipc.open_stream(f)
+        batches = []
+        try:
+            for batch in reader:
+                batches.append(batch)
+        except (pa.ArrowInvalid, OSError):
+            pass
+        table = pa.Table.from_batches(batches, schema=reader.schema)
+    if metrics is not None:
+        table = table.filter(pc.is_in(table["metric"], pa.array(metrics)))
+    return table
+
+
+def metric_params(table: pa.Table) -> dict[str, str]:
+    return json.loads(table.schema.metadata[b"params"])
+
+
+def template_pattern(template: str) -> re.Pattern:
+    """Regex matching what a ``{version}``/``{name}`` template expands to."""
+    pattern = ""
+    seen = set()
+    for i, part in enumerate(re.split(r"\{(version|name)\}", template)):
+        if i % 2 == 0:
+            pattern += re.escape(part)
+        elif part in seen:
+            pattern += f"(?P={part})"
+        else:
+            pattern += f"(?P<{part}>[^/]+)"
+            seen.add(part)
+    return re.compile(f"{pattern}$")
+
+
+def list_template(template: str) -> list[dict[str, str]]:
+    """Every existing URI a template expands to, with its version and name.
+
+    Lists everything below the last directory before the first placeholder
+    in a single recursive listing.
+    """
+    root = template[: template.index("{")].rpartition("/")[0] + "/"
+    resolved = FILESYSTEMS.resolve(root)
+    if resolved is None:
+        raise ValueError(f"No filesystem for URI {root}")
+    filesystem, path = resolved
+    pattern = template_pattern(template[len(root) :])
+    selector = fs.FileSelector(path, recursive=True, allow_not_found=True)
+    found = []
+    for info in filesystem.get_file_info(selector):
+        if info.type != fs.FileType.File:
+            continue
+        relative = posixpath.relpath(info.path, path)
+        match = pattern.match(relative)
+        if match is not None:
+            found.append({"uri": f"{root}{relative}", **match.groupdict()})
+    return sorted(found, key=lambda f: f["uri"])
+
+
 class MetricFactory(BaseModel, frozen=True):
+    """Build metric providers, streaming ones for ``.parquet``/``.arrow`` URIs."""
+
     uri: Annotated[str, NAME, VERSION, SCHEME] = (
         "file://./logs/{version}/{name}.metrics"
     )
@@ -118,10 +599,45 @@ class MetricFactory(BaseModel, frozen=True):
         name: str,
         log_provider: LogProvider | None = None,
     ) -> MetricProvider:
-        return MetricProvider(
-            self.uri.format(version=version, name=name),
-            log_provider=log_provider,
-        )
+        uri = self.uri.format(version=version, name=name)
+        if uri.endswith(STREAMING_EXTENSIONS):
+            return StreamingMetricProvider(uri, log_provider=log_provider)
+        return MetricProvider(uri, log_provider=log_provider)
+
+    def scan(
+        self,
+        metrics: list[str] | None = None,
+        names: list[str] | None = None,
+        min_version: str | None = None,
+        max_version: str | None = None,
+    ) -> pa.Table:
+        """Streamed metrics of many versions and nodes as a single table.
+
+        Versions and node names are matched against the paths the URI
+        template expands to, hence files outside the given names and the
+        inclusive version range are never opened, and Parquet files only
+        read the row groups which may hold the given metrics.
+        """
+        if not self.uri.endswith(STREAMING_EXTENSIONS):
+            raise ValueError(f"Only URIs ending with {STREAMING_EXTENSIONS} scan")
+        tables = []
+        for found in list_template(self.uri):
+            version, name = found["version"], found["name"]
+            if names is not None and name not in names:
+                continue
+            if min_version is not None and version < min_version:
+                continue
+            if max_version is not None and version > max_version:
+                continue
+            table = read_metrics(found["uri"], metrics).replace_schema_metadata()
+            tables.append(
+                table.add_column(0, "name", pa.repeat(name, table.num_rows)).add_column(
+                    0, "version", pa.repeat(version, table.num_rows)
+                )
+            )
+        if not tables:
+            return SCANNED_METRIC_SCHEMA.empty_table()
+        return pa.concat_tables(tables)
 
 
 TEST_METRIC = MetricProvider(log_provider=TEST_LOGGER)
@@ -0,0 +1,76 @@
+import os
+import time
+
+from pyarrow import fs
+
+from harmonia.base.filesystem import FILESYSTEMS
+
+
+def split_uri(uri: str) -> tuple[str, str]:
+    """Split a URI into its parent prefix and the name within it."""
+    scheme, _, path = uri.partition("://")
+    path = path.rstrip("/")
+    parent, _, name = path.rpartition("/")
+    if not parent and path.startswith("/"):
+        parent = "/"
+    return f"{scheme}://{parent}", name
+
+
+class EdgeProbe:
+    """Check whether many URIs exist with one listing per parent prefix.
+
+    Listings are kept for ``ttl`` seconds, hence probing thousands of edges
+    living in a handful of directories or object store prefixes costs a
+    handful of listing calls.  Local prefixes are listed with ``os.scandir``,
+    remote ones through the pyarrow filesystem for the scheme.  Whether a URI
+    of a scheme pyarrow cannot list exists is unknown, it is reported missing
+    so that whatever produces it runs again rather than being skipped.
+    """
+
+    def __init__(self, ttl: float = 5.0):
+        self.ttl = ttl
+        self._listings = {}
+
+    def _list(self, prefix: str) -> set[str] | None:
+        if prefix.startswith("file://"):
+            try:
+                with os.scandir(prefix[len("file://") :] or ".") as entries:
+                    return {entry.name for entry in entries}
+            except (FileNotFoundError, NotADirectoryError):
+                return set()
+
+        resolved = FILESYSTEMS.resolve(prefix)
+        if resolved is None:
+            return None
+        filesystem, path = resolved
+        selector = fs.FileSelector(path, allow_not_found=True)
+        return {info.base_name for info in filesystem.get_file_info(selector)}
+
+    def listing(self, prefix: str) -> set[str] | None:
+        now = time.monotonic()
+        cached = self._listings.get(prefix)
+        if cached is not None and now - cached[0] < self.ttl:
+            return cached[1]
+        names = self._list(prefix)
+        self._listings[prefix] = (now, names)
+        return names
+
+    def exists(self, uris: list[str]) -> dict[str, bool]:
+        by_prefix = {}
+        for uri in uris:
+            parent, name = split_uri(uri)
+            by_prefix.setdefault(parent, []).append((uri, name))
+
+        found = {}
+        for prefix, entries in by_prefix.items():
+            names = self.listing(prefix)
+            for uri, name in entries:
+                found[uri] = names is not None and name in names
+        return found
+
+    def invalidate(self, uri: str | None = None):
+        """Forget the listing holding ``uri``, or all listings."""
+        if uri is None:
+            self._listings.clear()
+        else:
+            self._listings.pop(split_uri(uri)[0], None)
@@ -0,0 +1,93 @@
+import os
+from typing import Annotated
+
+from pydantic import BaseModel
+from pydantic.functional_validators import BeforeValidator
+
+MEMINFO = "/proc/meminfo"
+
+
+def _immutable_dict(
+    mapping: dict[str, float] | tuple[tuple[str, float], ...],
+) -> tuple[tuple[str, float], ...]:
+    if hasattr(mapping, "items"):
+        return tuple(sorted(mapping.items()))
+    return mapping
+
+
+class Resources(BaseModel, frozen=True):
+    """Resources requested by a process, or available to an executor.
+
+    ``memory`` is in bytes, ``custom`` holds named resources such as GPU
+    slots or connections to a store.  A zero request does not limit anything
+    and neither does a capacity left at zero or not declared at all.
+    """
+
+    cpus: float = 0.0
+    memory: int = 0
+    custom: Annotated[
+        tuple[tuple[str, float], ...], BeforeValidator(_immutable_dict)
+    ] = ()
+
+    def amounts(self) -> dict[str, float]:
+        return {"cpus": self.cpus, "memory": self.memory, **dict(self.custom)}
+
+
+def detect_capacity() -> Resources:
+    """CPUs and total memory of this machine, memory is 0 when unknown."""
+    memory = 0
+    try:
+        with open(MEMINFO) as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    memory = int(line.split()[1]) * 1024  # reported in kB
+                    break
+    except OSError:
+        pass
+    return Resources(cpus=os.cpu_count() or 1, memory=memory)
+
+
+class ResourcePool:
+    """Resources held by running processes out of a fixed capacity.
+
+    A process fits when every resource it requests is still available.  A
+    process requesting more than the whole capacity fits only once nothing
+    else runs, so it runs alone instead of never.
+    """
+
+    def __init__(self, capacity: Resources):
+        self.capacity = {k: v for k, v in capacity.amounts().items() if v > 0}
+        self.in_use = dict.fromkeys(self.capacity, 0)
+        self.held = 0
+
+    def fits(self, resources: Resources) -> bool:
+        if not self.held:
+            return True
+        return all(
+            self.in_use[k] + v <= self.capacity[k]
+            for k, v in resources.amounts().items()
+            if k in self.capacity
+        )
+
+    def share(self, resources: Resources) -> float:
+        """Largest fraction of any resource of the capacity requested."""
+        return max(
+            (
+                v / self.capacity[k]
+                for k, v in resources.amounts().items()
+                if k in self.capacity
+            ),
+            default=0,
+        )
+
+    def acquire(self, resources: Resources):
+        self.held += 1
+        for k, v in resources.amounts().items():
+            if k in self.capacity:
+                self.in_use[k] += v
+
+    def release(self, resources: Resources):
+        self.held -= 1
+        for k, v in resources.amounts().items():
+            if k in self.capacity:
+                self.in_use[k] -= v
@@ -1,127 +1,908 @@
+import hashlib
 import json
 import os
 import posixpath
-from typing import Annotated
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from collections.abc import Callable, Hashable
+from datetime import UTC, datetime, timedelta
+from functools import cache, cached_property
+from types import NoneType, UnionType
+from typing import Annotated, Any, Literal, TypeVar, Union, get_args, get_origin
 
-from pydantic import BaseModel, ValidationError
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import fs
+from pydantic import BaseModel, TypeAdapter, ValidationError
 
 from harmonia.base import graph
-from harmonia.base.validators import SCHEME
+from harmonia.base.filesystem import FILESYSTEMS
+from harmonia.base.journal import RunEvent, RunningJournal, RunningState, replay
+from harmonia.base.ledger import RUN_SCHEMA, RunLedger
+from harmonia.base.validators import FILE_SCHEME, SCHEME, makedirs
+
+Model = TypeVar("Model", bound=BaseModel)
 
 
 class IncompatibleGraph(Exception):
     value: str
 
+    def __init__(self, value: str):
+        super().__init__(value)
+        self.value = value
+
 
 class UnreadableGraph(Exception):
     value: str
 
+    def __init__(self, value: str):
+        super().__init__(value)
+        self.value = value
+
+
+class ModelCache:
+    """Bounded LRU of validated models read from state files.
+
+    Entries are keyed by path and model and carry a stamp of the file they
+    were read from (e.g. mtime and size, or an etag), an entry whose stamp no
+    longer matches the file is stale and read again.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, stamp: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != stamp:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: tuple, stamp: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (stamp, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, path: str):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == path]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+MODEL_CACHE = ModelCache()
+
+# values JSON already decodes to the type a model holds
+JSON_TYPES = (Any, str, int, float, bool, NoneType)
+SEQUENCE_TYPES = (tuple, list, set, frozenset)
+
+
+def digest(model: type[BaseModel], text: str) -> str:
+    """Digest of a model's JSON, only matching when read as the same model."""
+    return hashlib.sha256(f"{model.__qualname__}\n{text}".encode()).hexdigest()
+
+
+def _is_model(annotation: Any) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
+
+
+def _builder(annotation: Any) -> Callable[[Any], Any]:
+    """Build values of ``annotation`` from decoded JSON without validating."""
+    origin, args = get_origin(annotation), get_args(annotation)
+    if origin is Annotated:
+        return _builder(args[0])
+    if _is_model(annotation):
+        return _model_builder(annotation)
+    if annotation in JSON_TYPES or origin is Literal:
+        return lambda value: value
+    if origin in (Union, UnionType):
+        # the first model or sequence member, as validation would pick it
+        model = next((_builder(a) for a in args if _is_model(a)), None)
+        sequence = next(
+            (_builder(a) for a in args if get_origin(a) in SEQUENCE_TYPES), None
+        )
+
+        def build_union(value):
+            if isinstance(value, dict) and model is not None:
+                return model(value)
+            if isinstance(value, list) and sequence is not None:
+                return sequence(value)
+            return value
+
+        return build_union
+    if origin is tuple and not (len(args) == 2 and args[1] is Ellipsis):
+        items = [_builder(a) for a in args]
+        return lambda value: tuple(b(v) for b, v in zip(items, value))
+    if origin in SEQUENCE_TYPES:
+        item = _builder(args[0]) if args else _builder(Any)
+        return lambda value: origin(item(v) for v in value)
+    if origin is dict:
+        item = _builder(args[1]) if args else _builder(Any)
+        return lambda value: {k: item(v) for k, v in value.items()}
+    # datetimes, enums and the like are few, validate them alone
+    return TypeAdapter(annotation).validate_python
+
+
+@cache
+def _model_builder(model: type[Model]) -> Callable[[dict], Model]:
+    fields = None
+    # what model_construct sets, without its per field alias and default lookup
+    plain = (
+        not model.__pydantic_post_init__ and model.model_config.get("extra") != "allow"
+    )
+
+    def build_model(data: dict) -> Model:
+        nonlocal fields
+        if fields is None:
+            # resolved on first use, models may refer to themselves
+            fields = [
+                (name, info.alias or name, _builder(info.annotation))
+                for name, info in model.model_fields.items()
+            ]
+        values = {name: build(data[key]) for name, key, build in fields if key in data}
+        if not plain or len(values) < len(fields):
+            return model.model_construct(**values)
+        instance = model.__new__(model)
+        object.__setattr__(instance, "__dict__", values)
+        object.__setattr__(instance, "__pydantic_fields_set__", set(values))
+        object.__setattr__(instance, "__pydantic_extra__", None)
+        object.__setattr__(instance, "__pydantic_private__", None)
+        return instance
+
+    return build_model
+
+
+def construct(model: type[Model], data: dict) -> Model:
+    """Build ``model`` from a trusted ``model_dump`` without validating it.
+
+    Nested models, tuples and unions are rebuilt the way validation would,
+    but no validator runs, e.g. ``Graph.validate`` does not compile the
+    graph again.  Only meant for data this package wrote itself.
+    """
+    return _model_builder(model)(data)
+
 
 class BaseStateProvider(BaseModel, frozen=True):
     graph_uri: Annotated[str, SCHEME] = "file://./state/graph/"
     compiled_uri: Annotated[str, SCHEME] = "file://./state/compiled/"
     running_uri: Annotated[str, SCHEME] = "file://./state/run/"
+    ledger_uri: Annotated[str, SCHEME] = "file://./state/ledger/"
+
+    @property
+    def ledger(self) -> RunLedger:
+        return RunLedger(uri=self.ledger_uri)
+
+    def record_runs(self, records: list[dict]):
+        self.ledger.append(records)
+
+    def read_runs(
+        self,
+        graph_name: str | None = None,
+        compiled_name: str | None = None,
+        version: str | None = None,
+        process: str | None = None,
+        status: str | None = None,
+        since: datetime | None = None,
+    ) -> pa.Table:
+        return self.ledger.scan(
+            graph_name, compiled_name, version, process, status, since
+        )
+
+    def latest_version(self, graph_name: str, compiled_name: str) -> str | None:
+        """The most recently finished version without failed processes."""
+        runs = self.read_runs(graph_name, compiled_name)
+        failed = runs.filter(pc.equal(runs["status"], "failed"))
+        failed_versions = set(failed["version"].to_pylist())
+        finished = runs.group_by("version").aggregate([("end", "max")])
+        candidates = [
+            (end, version)
+            for version, end in zip(
+                finished["version"].to_pylist(), finished["end_max"].to_pylist()
+            )
+            if version not in failed_versions
+        ]
+        return max(candidates)[1] if candidates else None
 
 
 class StateProvider(BaseStateProvider):
+    def _location(self, uri: str, *parts: str) -> str:
+        return posixpath.join(uri[len("file://") :], *parts)
+
+    def _list(self, location: str) -> list[str]:
+        return os.listdir(location)
+
+    def _walk(self, location: str) -> list[str]:
+        return [
+            os.path.relpath(os.path.join(root, f), location)
+            for root, _, files in os.walk(location)
+            for f in files
+        ]
+
+    def _stamp(self, location: str) -> Hashable | None:
+        try:
+            stat = os.stat(location)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _read_text(self, location: str) -> str:
+        with open(location) as f:
+            return f.read()
+
+    def _write_text(self, location: str, text: str):
+        # written aside and renamed over, a crash never leaves half a file
+        temporary = f"{location}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temporary, "w") as f:
+                f.write(text)
+            os.replace(temporary, location)
+        except BaseException:
+            try:
+                os.remove(temporary)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _append_text(self, location: str, text: str):
+        with open(location, "a") as f:
+            f.write(text)
+
+    def _read_appended(self, location: str) -> str:
+        try:
+            return self._read_text(location)
+        except FileNotFoundError:
+            return ""
+
+    def _clear_appended(self, location: str):
+        try:
+            os.remove(location)
+        except FileNotFoundError:
+            pass
+
+    def _cache_key(self, location: str) -> str:
+        return os.path.abspath(location)
+
+    def _read_digest(self, location: str) -> str | None:
+        try:
+            return self._read_text(f"{location}.sha256")
+        except OSError:
+            return None
+
+    def _read_model(self, location: str, model: type[Model]) -> Model:
+        """Read a model, validating it unless its digest matches its content.
+
+        The digest is written beside the model by ``_write_model``, a model
+        edited or written by anything else is validated in full.
+        """
+        stamp = self._stamp(location)
+        if stamp is None:
+            raise UnreadableGraph(value=location)
+        key = (self._cache_key(location), model)
+        cached = MODEL_CACHE.get(key, stamp)
+        if cached is not None:
+            return cached
+
+        try:
+            text = self._read_text(location)
+            model_json = json.loads(text)
+        except (FileNotFoundError, json.JSONDecodeError):
+            raise UnreadableGraph(value=location)
+        if self._read_digest(location) == digest(model, text):
+            value = construct(model, model_json)
+        else:
+            try:
+                value = model.model_validate(model_json)
+            except ValidationError:
+                raise IncompatibleGraph(value=json.dumps(model_json, indent=2))
+        MODEL_CACHE.put(key, stamp, value)
+        return value
+
+    def _write_model(self, location: str, value: BaseModel):
+        MODEL_CACHE.invalidate(self._cache_key(location))
+        text = json.dumps(value.model_dump(), indent=2)
+        self._write_text(location, text)
+        # written last, a model without its matching digest is validated
+        self._write_text(f"{location}.sha256", digest(type(value), text))
+
     def list_graphs(self) -> list[str]:
         return [
             f[: -len(".json")]
-            for f in os.listdir(self.graph_uri[len("file://") :])
+            for f in self._list(self._location(self.graph_uri))
             if f.endswith(".json")
         ]
 
     def list_compiled(self, graph_name: str) -> list[str]:
         return [
             f[: -len(".json")]
-            for f in os.listdir(
-                posixpath.join(self.compiled_uri[len("file://") :], graph_name)
-            )
+            for f in self._list(self._location(self.compiled_uri, graph_name))
             if f.endswith(".json")
         ]
 
     def list_versions(self, graph_name: str, compiled_name: str) -> list[str]:
         return [
             f[: -len(".json")]
-            for f in os.listdir(
-                posixpath.join(
-                    self.running_uri[len("file://") :],
-                    graph_name,
-                    compiled_name,
-                )
+            for f in self._list(
+                self._location(self.running_uri, graph_name, compiled_name)
             )
             if f.endswith(".json")
         ]
 
+    def list_all_versions(self, graph_name: str) -> dict[str, list[str]]:
+        """Versions of every compiled graph of a graph, in a single listing."""
+        versions = defaultdict(list)
+        for path in self._walk(self._location(self.running_uri, graph_name)):
+            compiled_name, _, f = path.partition("/")
+            if f.endswith(".json") and "/" not in f:
+                versions[compiled_name].append(f[: -len(".json")])
+        return dict(versions)
+
     def read_graph(self, graph_name: str) -> graph.Graph:
-        graph_file = posixpath.join(
-            self.graph_uri[len("file://") :], f"{graph_name}.json"
-        )
-        try:
-            with open(graph_file) as f:
-                graph_json = json.loads(f.read())
-        except (FileNotFoundError, json.JSONDecodeError):
-            raise UnreadableGraph(value=graph_file)
-        try:
-            return graph.Graph.model_validate(graph_json)
-        except ValidationError:
-            raise IncompatibleGraph(value=json.dumps(graph_json, indent=2))
+        graph_file = self._location(self.graph_uri, f"{graph_name}.json")
+        return self._read_model(graph_file, graph.Graph)
 
     def write_graph(self, graph_: graph.Graph):
-        graph_file = posixpath.join(
-            self.graph_uri[len("file://") :], f"{graph_.name}.json"
+        graph_file = self._location(self.graph_uri, f"{graph_.name}.json")
+        self._write_model(graph_file, graph_)
+
+    def read_compiled(self, graph_name: str, compiled_name: str) -> graph.CompiledGraph:
+        compiled_file = self._location(
+            self.compiled_uri, graph_name, f"{compiled_name}.json"
+        )
+        return self._read_model(compiled_file, graph.CompiledGraph)
+
+    def write_compiled(self, graph_name: str, compiled: graph.Graph):
+        compiled_file = self._location(
+            self.compiled_uri, graph_name, f"{compiled.name}.json"
+        )
+        self._write_model(compiled_file, compiled)
+
+    def read_running(
+        self, graph_name: str, compiled_name: str, version: str
+    ) -> graph.Graph:
+        running_file = self._location(
+            self.running_uri, graph_name, compiled_name, f"{version}.json"
+        )
+        return self._read_model(running_file, graph.Graph)
+
+    def write_running(
+        self, graph_name: str, compiled_name: str, version: str, running: graph.Graph
+    ):
+        running_file = self._location(
+            self.running_uri, graph_name, compiled_name, f"{version}.json"
+        )
+        self._write_model(running_file, running)
+
+    def _journal_location(
+        self, graph_name: str, compiled_name: str, version: str, suffix: str
+    ) -> str:
+        return self._location(
+            self.running_uri, graph_name, compiled_name, f"{version}.{suffix}"
+        )
+
+    @property
+    def journal(self) -> RunningJournal:
+        return RunningJournal(self)
+
+    def append_events(
+        self,
+        graph_name: str,
+        compiled_name: str,
+        version: str,
+        events: list[RunEvent],
+    ):
+        journal_file = self._journal_location(
+            graph_name, compiled_name, version, "journal"
+        )
+        self._append_text(
+            journal_file, "".join(f"{e.model_dump_json()}\n" for e in events)
+        )
+
+    def read_running_state(
+        self, graph_name: str, compiled_name: str, version: str
+    ) -> RunningState:
+        """Replay the journal of a version on top of its last snapshot."""
+        snapshot_file = self._journal_location(
+            graph_name, compiled_name, version, "state"
+        )
+        journal_file = self._journal_location(
+            graph_name, compiled_name, version, "journal"
+        )
+        state = RunningState()
+        if self._stamp(snapshot_file) is not None:
+            state = RunningState.model_validate_json(self._read_text(snapshot_file))
+        return replay(self._read_appended(journal_file), state)
+
+    def compact_running(self, graph_name: str, compiled_name: str, version: str):
+        """Fold the journal of a version into its snapshot."""
+        state = self.read_running_state(graph_name, compiled_name, version)
+        self._write_text(
+            self._journal_location(graph_name, compiled_name, version, "state"),
+            state.model_dump_json(),
+        )
+        self._clear_appended(
+            self._journal_location(graph_name, compiled_name, version, "journal")
+        )
+
+
+class ObjectStateProvider(StateProvider):
+    """State provider for any URI scheme with a pyarrow filesystem.
+
+    Works against object stores (``s3://``, ``gs://``, ...) as well as local
+    ``file://`` URIs.  Filesystems come from the shared pool, so connections
+    are reused across reads, writes and listings, and every listing is one
+    call.  The file stamps used by the model cache come from the store's
+    metadata, no object is downloaded unless it changed.
+    """
+
+    def _resolve(self, uri: str) -> tuple[fs.FileSystem, str]:
+        resolved = FILESYSTEMS.resolve(uri)
+        if resolved is None:
+            raise ValueError(f"No filesystem for URI {uri}")
+        return resolved
+
+    def _location(self, uri: str, *parts: str) -> str:
+        return posixpath.join(uri.rstrip("/"), *parts)
+
+    def _list(self, location: str) -> list[str]:
+        filesystem, path = self._resolve(location)
+        selector = fs.FileSelector(path, allow_not_found=True)
+        return [info.base_name for info in filesystem.get_file_info(selector)]
+
+    def _walk(self, location: str) -> list[str]:
+        filesystem, path = self._resolve(location)
+        selector = fs.FileSelector(path, allow_not_found=True, recursive=True)
+        return [
+            posixpath.relpath(info.path, path)
+            for info in filesystem.get_file_info(selector)
+            if info.type == fs.FileType.File
+        ]
+
+    def _stamp(self, location: str) -> Hashable | None:
+        filesystem, path = self._resolve(location)
+        info = filesystem.get_file_info(path)
+        if info.type == fs.FileType.NotFound:
+            return None
+        return (info.mtime_ns, info.size)
+
+    def _read_text(self, location: str) -> str:
+        filesystem, path = self._resolve(location)
+        with filesystem.open_input_stream(path) as f:
+            return f.read().decode()
+
+    def _write_text(self, location: str, text: str):
+        filesystem, path = self._resolve(location)
+        filesystem.create_dir(posixpath.dirname(path))
+        with filesystem.open_output_stream(path) as f:
+            f.write(text.encode())
+
+    def _append_text(self, location: str, text: str):
+        # objects cannot be appended to, every append is a part of its own
+        part = f"part-{time.time_ns()}-{uuid.uuid4().hex}"
+        self._write_text(posixpath.join(location, part), text)
+
+    def _parts(self, location: str) -> list[str]:
+        return sorted(
+            f"{location}/{name}"
+            for name in self._list(location)
+            if name.startswith("part-")
+        )
+
+    def _read_appended(self, location: str) -> str:
+        return "".join(self._read_text(part) for part in self._parts(location))
+
+    def _clear_appended(self, location: str):
+        for part in self._parts(location):
+            filesystem, path = self._resolve(part)
+            filesystem.delete_file(path)
+
+    def _cache_key(self, location: str) -> str:
+        return location
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS graphs (
+    name TEXT PRIMARY KEY,
+    revision INTEGER NOT NULL,
+    body TEXT NOT NULL,
+    digest TEXT
+);
+CREATE TABLE IF NOT EXISTS compiled (
+    graph TEXT NOT NULL,
+    name TEXT NOT NULL,
+    revision INTEGER NOT NULL,
+    body TEXT NOT NULL,
+    digest TEXT,
+    PRIMARY KEY (graph, name)
+);
+CREATE TABLE IF NOT EXISTS running (
+    graph TEXT NOT NULL,
+    compiled TEXT NOT NULL,
+    version TEXT NOT NULL,
+    revision INTEGER NOT NULL,
+    body TEXT NOT NULL,
+    digest TEXT,
+    PRIMARY KEY (graph, compiled, version)
+);
+CREATE TABLE IF NOT EXISTS runs (
+    graph TEXT NOT NULL,
+    compiled TEXT NOT NULL,
+    version TEXT NOT NULL,
+    process TEXT NOT NULL,
+    status TEXT NOT NULL,
+    start INTEGER,
+    end INTEGER,
+    exit_code INTEGER
+);
+CREATE TABLE IF NOT EXISTS events (
+    graph TEXT NOT NULL,
+    compiled TEXT NOT NULL,
+    version TEXT NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS statuses (
+    graph TEXT NOT NULL,
+    compiled TEXT NOT NULL,
+    version TEXT NOT NULL,
+    process TEXT NOT NULL,
+    status TEXT NOT NULL,
+    at INTEGER NOT NULL,
+    PRIMARY KEY (graph, compiled, version, process)
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    graph TEXT NOT NULL,
+    compiled TEXT NOT NULL,
+    version TEXT NOT NULL,
+    body TEXT NOT NULL,
+    PRIMARY KEY (graph, compiled, version)
+);
+CREATE INDEX IF NOT EXISTS events_by_version ON events (graph, compiled, version);
+CREATE INDEX IF NOT EXISTS runs_by_status ON runs (graph, compiled, version, status);
+CREATE INDEX IF NOT EXISTS runs_by_end ON runs (graph, compiled, end);
+CREATE INDEX IF NOT EXISTS statuses_by_status
+    ON statuses (status, graph, compiled, version);
+"""
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+
+def _to_micros(moment: datetime | None) -> int | None:
+    if moment is None:
+        return None
+    return (moment - EPOCH) // timedelta(microseconds=1)
+
+
+class SqliteLedger:
+    """Run ledger stored in the ``runs`` table of a state database."""
+
+    def __init__(self, provider: "SqliteStateProvider"):
+        self.provider = provider
+
+    def append(self, records: list[dict]):
+        with self.provider.connection() as connection:
+            connection.executemany(
+                "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        r["graph"],
+                        r["compiled"],
+                        r["version"],
+                        r["process"],
+                        r["status"],
+                        _to_micros(r["start"]),
+                        _to_micros(r["end"]),
+                        r["exit_code"],
+                    )
+                    for r in records
+                ],
+            )
+
+    def scan(
+        self,
+        graph_name: str | None = None,
+        compiled_name: str | None = None,
+        version: str | None = None,
+        process: str | None = None,
+        status: str | None = None,
+        since: datetime | None = None,
+    ) -> pa.Table:
+        conditions = []
+        params = []
+        for column, value in [
+            ("graph", graph_name),
+            ("compiled", compiled_name),
+            ("version", version),
+            ("process", process),
+            ("status", status),
+        ]:
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            conditions.append("start >= ?")
+            params.append(_to_micros(since))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self.provider.connection().execute(
+            f"SELECT * FROM runs {where} ORDER BY rowid", params
+        )
+        columns = list(zip(*rows.fetchall())) or [[] for _ in RUN_SCHEMA]
+        return pa.Table.from_arrays(
+            [pa.array(c, type=f.type) for c, f in zip(columns, RUN_SCHEMA)],
+            schema=RUN_SCHEMA,
         )
-        with open(graph_file, "w") as f:
-            f.write(json.dumps(graph_.model_dump(), indent=2))
+
+
+class SqliteStateProvider(BaseModel, frozen=True):
+    """State provider keeping graphs and runs in a single SQLite database.
+
+    Listings, run queries and processes by their journaled status are
+    indexed lookups.  The database runs in WAL mode, so many local executors
+    can read while one of them writes.
+    """
+
+    db_uri: Annotated[str, FILE_SCHEME] = "file://./state/harmonia.db"
+
+    @cached_property
+    def _local(self) -> threading.local:
+        return threading.local()
+
+    def connection(self) -> sqlite3.Connection:
+        """The connection of the calling thread, opened on first use."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            makedirs(self.db_uri)
+            connection = sqlite3.connect(self.db_uri[len("file://") :], timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SQLITE_SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def _read_model(
+        self, table: str, keys: dict[str, str], model: type[Model]
+    ) -> Model:
+        where = " AND ".join(f"{k} = ?" for k in keys)
+        row = (
+            self.connection()
+            .execute(
+                f"SELECT revision, body, digest FROM {table} WHERE {where}",
+                list(keys.values()),
+            )
+            .fetchone()
+        )
+        description = f"{self.db_uri}:{table}:{'/'.join(keys.values())}"
+        if row is None:
+            raise UnreadableGraph(value=description)
+        revision, body, body_digest = row
+        key = (description, model)
+        # the digest also tells apart bodies rewritten without a new revision
+        stamp = (revision, body_digest)
+        cached = MODEL_CACHE.get(key, stamp)
+        if cached is not None:
+            return cached
+        if body_digest == digest(model, body):
+            value = construct(model, json.loads(body))
+        else:
+            try:
+                value = model.model_validate_json(body)
+            except ValidationError:
+                raise IncompatibleGraph(value=body)
+        MODEL_CACHE.put(key, stamp, value)
+        return value
+
+    def _write_model(self, table: str, keys: dict[str, str], value: BaseModel):
+        columns = ", ".join(keys)
+        placeholders = ", ".join("?" for _ in keys)
+        body = json.dumps(value.model_dump(), indent=2)
+        with self.connection() as connection:
+            connection.execute(
+                f"INSERT INTO {table} ({columns}, revision, body, digest) "
+                f"VALUES ({placeholders}, 0, ?, ?) "
+                f"ON CONFLICT ({columns}) DO UPDATE "
+                "SET revision = revision + 1, body = excluded.body, "
+                "digest = excluded.digest",
+                [*keys.values(), body, digest(type(value), body)],
+            )
+
+    def _column(self, query: str, params: list[str] = ()) -> list[str]:
+        return [row[0] for row in self.connection().execute(query, params)]
+
+    def list_graphs(self) -> list[str]:
+        return self._column("SELECT name FROM graphs ORDER BY name")
+
+    def list_compiled(self, graph_name: str) -> list[str]:
+        return self._column(
+            "SELECT name FROM compiled WHERE graph = ? ORDER BY name", [graph_name]
+        )
+
+    def list_versions(self, graph_name: str, compiled_name: str) -> list[str]:
+        return self._column(
+            "SELECT version FROM running WHERE graph = ? AND compiled = ? "
+            "ORDER BY version",
+            [graph_name, compiled_name],
+        )
+
+    def list_all_versions(self, graph_name: str) -> dict[str, list[str]]:
+        versions = defaultdict(list)
+        for compiled_name, version in self.connection().execute(
+            "SELECT compiled, version FROM running WHERE graph = ? "
+            "ORDER BY compiled, version",
+            [graph_name],
+        ):
+            versions[compiled_name].append(version)
+        return dict(versions)
+
+    def read_graph(self, graph_name: str) -> graph.Graph:
+        return self._read_model("graphs", {"name": graph_name}, graph.Graph)
+
+    def write_graph(self, graph_: graph.Graph):
+        self._write_model("graphs", {"name": graph_.name}, graph_)
 
     def read_compiled(self, graph_name: str, compiled_name: str) -> graph.CompiledGraph:
-        compiled_file = posixpath.join(
-            self.compiled_uri[len("file://") :], graph_name, f"{compiled_name}.json"
+        return self._read_model(
+            "compiled",
+            {"graph": graph_name, "name": compiled_name},
+            graph.CompiledGraph,
         )
-        try:
-            with open(compiled_file) as f:
-                compiled_json = json.loads(f.read())
-        except (FileNotFoundError, json.JSONDecodeError):
-            raise UnreadableGraph(value=compiled_file)
-        try:
-            return graph.CompiledGraph.model_validate(compiled_json)
-        except ValidationError:
-            raise IncompatibleGraph(value=json.dumps(compiled_json, indent=2))
 
     def write_compiled(self, graph_name: str, compiled: graph.Graph):
-        compiled_file = posixpath.join(
-            self.compiled_uri[len("file://") :], graph_name, f"{compiled.name}.json"
+        self._write_model(
+            "compiled", {"graph": graph_name, "name": compiled.name}, compiled
         )
-        with open(compiled_file, "w") as f:
-            f.write(json.dumps(compiled.model_dump(), indent=2))
 
     def read_running(
         self, graph_name: str, compiled_name: str, version: str
     ) -> graph.Graph:
-        running_file = posixpath.join(
-            self.running_uri[len("file://") :],
-            graph_name,
-            compiled_name,
-            f"{version}.json",
+        return self._read_model(
+            "running",
+            {"graph": graph_name, "compiled": compiled_name, "version": version},
+            graph.Graph,
         )
-        try:
-            with open(running_file) as f:
-                running_json = json.loads(f.read())
-        except (FileNotFoundError, json.JSONDecodeError):
-            raise UnreadableGraph(value=running_file)
-        try:
-            return graph.Graph.model_validate(running_json)
-        except ValidationError:
-            raise IncompatibleGraph(value=json.dumps(running_json, indent=2))
 
     def write_running(
         self, graph_name: str, compiled_name: str, version: str, running: graph.Graph
     ):
-        running_file = posixpath.join(
-            self.running_uri[len("file://") :],
-            graph_name,
-            compiled_name,
-            f"{version}.json",
-        )
-        with open(running_file, "w") as f:
-            f.write(json.dumps(running.model_dump(), indent=2))
+        self._write_model(
+            "running",
+            {"graph": graph_name, "compiled": compiled_name, "version": version},
+            running,
+        )
+
+    @property
+    def journal(self) -> RunningJournal:
+        return RunningJournal(self)
+
+    def append_events(
+        self,
+        graph_name: str,
+        compiled_name: str,
+        version: str,
+        events: list[RunEvent],
+    ):
+        keys = (graph_name, compiled_name, version)
+        with self.connection() as connection:
+            connection.executemany(
+                "INSERT INTO events VALUES (?, ?, ?, ?)",
+                [(*keys, e.model_dump_json()) for e in events],
+            )
+            # the latest status of every process, indexed by status
+            connection.executemany(
+                "INSERT OR REPLACE INTO statuses VALUES (?, ?, ?, ?, ?, ?)",
+                [(*keys, e.process, e.status, _to_micros(e.at)) for e in events],
+            )
+
+    def processes_with_status(
+        self,
+        status: str,
+        graph_name: str | None = None,
+        compiled_name: str | None = None,
+        version: str | None = None,
+    ) -> list[tuple[str, str, str, str]]:
+        """Processes whose latest journaled status is ``status``.
+
+        ``started`` gives the processes running now.  Every process comes as
+        its graph, compiled graph, version and name.
+        """
+        filters = {
+            "status": status,
+            "graph": graph_name,
+            "compiled": compiled_name,
+            "version": version,
+        }
+        filters = {k: v for k, v in filters.items() if v is not None}
+        where = " AND ".join(f"{k} = ?" for k in filters)
+        return (
+            self.connection()
+            .execute(
+                f"SELECT graph, compiled, version, process FROM statuses WHERE {where} "
+                "ORDER BY graph, compiled, version, process",
+                list(filters.values()),
+            )
+            .fetchall()
+        )
+
+    def _running_state(
+        self, graph_name: str, compiled_name: str, version: str
+    ) -> tuple[RunningState, int]:
+        keys = [graph_name, compiled_name, version]
+        connection = self.connection()
+        row = connection.execute(
+            "SELECT body FROM snapshots WHERE graph = ? AND compiled = ? "
+            "AND version = ?",
+            keys,
+        ).fetchone()
+        state = (
+            RunningState() if row is None else RunningState.model_validate_json(row[0])
+        )
+        rows = connection.execute(
+            "SELECT rowid, body FROM events WHERE graph = ? AND compiled = ? "
+            "AND version = ? ORDER BY rowid",
+            keys,
+        ).fetchall()
+        for _, body in rows:
+            state.apply(RunEvent.model_validate_json(body))
+        return state, rows[-1][0] if rows else 0
+
+    def read_running_state(
+        self, graph_name: str, compiled_name: str, version: str
+    ) -> RunningState:
+        """Replay the events of a version on top of its last snapshot."""
+        return self._running_state(graph_name, compiled_name, version)[0]
+
+    def compact_running(self, graph_name: str, compiled_name: str, version: str):
+        """Fold the events of a version into its snapshot."""
+        keys = [graph_name, compiled_name, version]
+        with self.connection() as connection:
+            state, last = self._running_state(*keys)
+            connection.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?)",
+                [*keys, state.model_dump_json()],
+            )
+            connection.execute(
+                "DELETE FROM events WHERE graph = ? AND compiled = ? "
+                "AND version = ? AND rowid <= ?",
+                [*keys, last],
+            )
+
+    @property
+    def ledger(self) -> SqliteLedger:
+        return SqliteLedger(self)
+
+    def record_runs(self, records: list[dict]):
+        self.ledger.append(records)
+
+    def read_runs(
+        self,
+        graph_name: str | None = None,
+        compiled_name: str | None = None,
+        version: str | None = None,
+        process: str | None = None,
+        status: str | None = None,
+        since: datetime | None = None,
+    ) -> pa.Table:
+        return self.ledger.scan(
+            graph_name, compiled_name, version, process, status, since
+        )
+
+    def latest_version(self, graph_name: str, compiled_name: str) -> str | None:
+        """The most recently finished version without failed processes."""
+        row = (
+            self.connection()
+            .execute(
+                "SELECT version FROM runs WHERE graph = ? AND compiled = ? "
+                "GROUP BY version HAVING SUM(status = 'failed') = 0 "
+                "ORDER BY MAX(end) DESC LIMIT 1",
+                [graph_name, compiled_name],
+            )
+            .fetchone()
+        )
+        return None if row is None else row[0]
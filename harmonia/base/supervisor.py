@@ -0,0 +1,72 @@
+import os
+import selectors
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from harmonia.base.graph import NodeMetadata
+
+# only used on platforms without pidfd support
+POLL_INTERVAL = 0.1
+
+
+class Supervisor:
+    """Wait on many running children at once.
+
+    Every registered child gets a pidfd which becomes readable when the child
+    exits, hence a single ``select`` call covers all running children and the
+    time to notice an exit does not depend on how many children are running.
+    Where pidfds are not available children are polled instead.
+    """
+
+    def __init__(self):
+        self._selector = selectors.DefaultSelector()
+        self._polled = []
+
+    def __len__(self) -> int:
+        return len(self._selector.get_map()) + len(self._polled)
+
+    def register(self, nm: "NodeMetadata"):
+        try:
+            pidfd = os.pidfd_open(nm.meta.pid)
+        except (AttributeError, OSError):
+            # no pidfd support, or the child has already been reaped
+            self._polled.append(nm)
+            return
+        self._selector.register(pidfd, selectors.EVENT_READ, nm)
+
+    def wait(self, timeout: float | None = None) -> list["NodeMetadata"]:
+        """Return the children that exited, blocking up to ``timeout`` seconds.
+
+        A ``timeout`` of ``None`` blocks until at least one child exits, an
+        empty list is returned right away when nothing is registered.
+        """
+        if not len(self):
+            return []
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            finished = [nm for nm in self._polled if nm.poll() is not None]
+            for nm in finished:
+                self._polled.remove(nm)
+
+            select_timeout = None if deadline is None else deadline - time.monotonic()
+            if finished or (select_timeout is not None and select_timeout <= 0):
+                select_timeout = 0
+            elif self._polled:
+                select_timeout = min(select_timeout or POLL_INTERVAL, POLL_INTERVAL)
+            for key, _ in self._selector.select(select_timeout):
+                self._selector.unregister(key.fd)
+                os.close(key.fd)
+                key.data.poll()  # reap the child
+                finished.append(key.data)
+
+            if finished or select_timeout == 0:
+                return finished
+
+    def close(self):
+        for key in list(self._selector.get_map().values()):
+            self._selector.unregister(key.fd)
+            os.close(key.fd)
+        self._selector.close()
+        self._polled = []
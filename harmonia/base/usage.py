@@ -0,0 +1,43 @@
+import os
+import sys
+
+
+def read_proc_io(pid: int) -> dict[str, int]:
+    """Block I/O of a process from ``/proc/<pid>/io``, empty if unavailable."""
+    try:
+        with open(f"/proc/{pid}/io") as f:
+            counters = dict(line.split(": ") for line in f.read().splitlines())
+    except (OSError, ValueError):
+        return {}
+    return {
+        "read_bytes": int(counters.get("read_bytes", 0)),
+        "write_bytes": int(counters.get("write_bytes", 0)),
+    }
+
+
+def reap(pid: int, block: bool = False) -> tuple[int, dict[str, float]] | None:
+    """Reap an exited child, returning its exit code and resource usage.
+
+    The child is only waited for once it exited (``None`` is returned right
+    away otherwise unless ``block`` is set), its I/O counters are read while
+    it is still a zombie and CPU time and peak memory come from ``wait4``.
+    Raises ``ChildProcessError`` if the child was already reaped.
+    """
+    options = os.WEXITED | os.WNOWAIT
+    if not block:
+        options |= os.WNOHANG
+    if os.waitid(os.P_PID, pid, options) is None:
+        return None
+
+    usage = read_proc_io(pid)
+    _, status, rusage = os.wait4(pid, 0)
+    # ru_maxrss is in kB on Linux and in bytes on macOS
+    rss_unit = 1 if sys.platform == "darwin" else 1024
+    usage.update(
+        {
+            "user_cpu_seconds": rusage.ru_utime,
+            "system_cpu_seconds": rusage.ru_stime,
+            "max_rss_bytes": rusage.ru_maxrss * rss_unit,
+        }
+    )
+    return os.waitstatus_to_exitcode(status), usage
@@ -0,0 +1,70 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from harmonia.base import capture, graph, log
+
+
+class FailingLog:
+    def write(self, text: str):
+        raise OSError("Log store is gone")
+
+
+def test_failing_log_only_stops_its_own_pipe(tmp_path: Path):
+    failing_r, failing_w = os.pipe()
+    failing = capture.LOG_CAPTURE.attach(failing_r, FailingLog())
+    os.write(failing_w, b"odile\n")
+    os.close(failing_w)
+    assert failing.wait(5)
+    assert isinstance(failing.error, OSError)
+
+    logger = log.LogProvider(f"file://{tmp_path}/odette.log")
+    read_fd, write_fd = os.pipe()
+    drain = capture.LOG_CAPTURE.attach(read_fd, logger)
+    os.write(write_fd, b"odette\n")
+    os.close(write_fd)
+    assert drain.wait(5)
+    assert drain.error is None
+    logger.close()
+    assert (tmp_path / "odette.log").read_text() == "odette\n"
+
+
+def test_child_outlives_its_failing_log():
+    read_fd, write_fd = os.pipe()
+    child = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "import sys, time\n"
+            "for _ in range(20):\n"
+            "    print('odile' * 1000, flush=True)\n"
+            "    time.sleep(0.01)",
+        ],
+        stdout=write_fd,
+    )
+    os.close(write_fd)
+    drain = capture.LOG_CAPTURE.attach(read_fd, FailingLog())
+    assert child.wait(10) == 0
+    assert drain.wait(5)
+    assert isinstance(drain.error, OSError)
+
+
+def test_close_does_not_wait_on_grandchildren(
+    log_provider_factory: log.LogProviderFactory, monkeypatch
+):
+    monkeypatch.setattr(graph.NodeMetadata, "drain_timeout", 0.1)
+    node = graph.Node(
+        name="rothbart",
+        cmd=[
+            sys.executable,
+            "-c",
+            "import subprocess, sys; "
+            "subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(3)'])",
+        ],
+        log_provider_factory=log_provider_factory,
+    )
+    metadata = node.run("curse", [])
+    assert metadata.wait() == 0
+    metadata.close()
+    assert isinstance(metadata.capture_error, TimeoutError)
@@ -0,0 +1,71 @@
+import sys
+
+import pytest
+
+from harmonia.base import graph, log
+
+distributed = pytest.importorskip("distributed")
+dask_executor = pytest.importorskip("harmonia.base.dask_executor")
+
+
+@pytest.fixture(scope="module")
+def client():
+    with distributed.LocalCluster(
+        n_workers=2,
+        threads_per_worker=2,
+        processes=False,
+        dashboard_address=None,
+    ) as cluster:
+        with distributed.Client(cluster) as client:
+            yield client
+
+
+def test_dask_task_graph(swan_lake_graph: graph.Graph):
+    compiled = swan_lake_graph.compile_graph("swan_lake", *swan_lake_graph.full_io())
+    tasks = dask_executor.DaskExecutor().tasks(compiled, "finale")
+
+    assert sorted(tasks) == sorted(p.node.name for p in compiled.order)
+    dependencies = tasks["presto"].dask.dependencies[tasks["presto"].key]
+    assert dependencies == {tasks["scene-pas-de-trois"].key, tasks["scene-no-3"].key}
+
+
+def test_dask_runs_full_graph(client, swan_lake_graph: graph.Graph):
+    compiled = swan_lake_graph.compile_graph("swan_lake", *swan_lake_graph.full_io())
+    return_codes = dask_executor.DaskExecutor(client).run(compiled, "finale")
+
+    assert return_codes == {p.node.name: 0 for p in swan_lake_graph.processes}
+
+
+def test_dask_stops_downstream_of_failure(
+    client, log_provider_factory: log.LogProviderFactory
+):
+    overture = graph.Edge(uri="file://./data/overture/")
+    strings = graph.Edge(uri="file://./data/{version}/strings/")
+    tutti = graph.Edge(uri="file://./data/{version}/tutti/")
+    g = graph.Graph(
+        name="symphony",
+        processes=[
+            graph.Process(
+                node=graph.Node(
+                    name="strings",
+                    cmd=[sys.executable, "-c", "import sys; sys.exit(4)"],
+                    log_provider_factory=log_provider_factory,
+                ),
+                input_edges=[overture],
+                output_edges=[strings],
+            ),
+            graph.Process(
+                node=graph.Node(
+                    name="tutti",
+                    cmd=[sys.executable, "-c", "pass"],
+                    log_provider_factory=log_provider_factory,
+                ),
+                input_edges=[strings],
+                output_edges=[tutti],
+            ),
+        ],
+        edges=[overture, strings, tutti],
+    )
+    compiled = g.compile_graph("symphony", *g.full_io())
+
+    assert dask_executor.DaskExecutor(client).run(compiled, "largo") == {"strings": 4}
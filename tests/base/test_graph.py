@@ -1,12 +1,16 @@
+import asyncio
+import copy
 import json
+import os
 import sys
 import time
+from collections.abc import Callable
 from pathlib import Path
 
 import pytest
 from pydantic import ValidationError
 
-from harmonia.base import graph, log, validators
+from harmonia.base import graph, log, resources, validators
 
 
 def test_node_creation_validates(log_provider_factory):
@@ -46,6 +50,46 @@ def test_running_node_gives_heatbeats(log_provider_factory):
     assert return_code == 0
 
 
+def test_node_records_resource_usage(
+    tmp_path: Path, log_provider_factory: log.LogProviderFactory
+):
+    node = graph.Node(
+        name="bolero",
+        cmd=[sys.executable, "-c", "bytearray(50_000_000)"],
+        log_provider_factory=log_provider_factory,
+        usage_factory=log.MetricFactory(
+            uri=f"file://{tmp_path}/usage/{{version}}/{{name}}.arrow"
+        ),
+    )
+
+    metadata = node.run("crescendo", [])
+    assert metadata.wait() == 0
+    assert node.heartbeat(metadata, "crescendo") == 0
+    metadata.close()
+
+    metrics = log.read_metrics(f"file://{tmp_path}/usage/crescendo/bolero.arrow")
+    recorded = dict(zip(metrics["metric"].to_pylist(), metrics["value"].to_pylist()))
+    assert recorded["wall_seconds"] > 0
+    assert recorded["max_rss_bytes"] > 50_000_000
+    assert {"user_cpu_seconds", "system_cpu_seconds"} <= set(recorded)
+
+
+def test_node_reaped_elsewhere_does_not_succeed(
+    log_provider_factory: log.LogProviderFactory,
+):
+    node = graph.Node(
+        name="bolero",
+        cmd=[sys.executable, "-c", "pass"],
+        log_provider_factory=log_provider_factory,
+    )
+
+    metadata = node.run("crescendo", [])
+    os.waitpid(metadata.meta.pid, 0)
+    assert metadata.wait() == graph.EXIT_UNKNOWN
+    assert metadata.poll() == graph.EXIT_UNKNOWN
+    metadata.close()
+
+
 def test_edge_creation_validates():
     graph.Edge(uri="file://./data/score.tar.gz")
 
@@ -71,13 +115,38 @@ def test_edge_vs_local_exists(tmp_path: Path):
     local_edge = graph.LocalEdge(uri=music_score_uri)
 
     assert edge.build_uri("allegro") == local_edge.build_uri("allegro")
-    assert edge.exists() is True
-    assert local_edge.exists() is False
 
+    # the template itself is no version of the edge
     with open(music_score, "w") as f:
         f.write("music")
 
-    assert local_edge.exists() is True
+    assert edge.exists("allegro") is False
+    assert local_edge.exists("allegro") is False
+
+    validators.makedirs(f"file://{tmp_path}/data/allegro/composition.tar.gz")
+    with open(edge.build_uri("allegro")[len("file://") :], "w") as f:
+        f.write("music")
+
+    assert edge.exists("allegro") is True
+    assert local_edge.exists("allegro") is True
+    assert edge.exists("adagio") is False
+    assert local_edge.exists("adagio") is False
+
+
+def test_edges_exist_in_batch(tmp_path: Path):
+    (tmp_path / "vivace").mkdir()
+    (tmp_path / "vivace/violin.parquet").write_text("strings")
+    violin = graph.LocalEdge(uri=f"file://{tmp_path}/{{version}}/violin.parquet")
+    cello = graph.LocalEdge(uri=f"file://{tmp_path}/{{version}}/cello.parquet")
+    remote = graph.Edge(uri="http://example.com/{version}/viola.parquet")
+
+    found = graph.edges_exist([violin, cello, remote], "vivace")
+    # remote cannot be listed, it is not known to exist
+    assert found == {violin: True, cello: False, remote: False}
+    assert graph.edges_exist([violin, cello], "lento") == {
+        violin: False,
+        cello: False,
+    }
 
 
 def test_edges_can_be_compared():
@@ -232,6 +301,33 @@ def test_graph_can_serialised(swan_lake_graph: graph.Graph):
     assert swan_lake_graph == reconstructed
 
 
+def test_graph_index_is_cached(swan_lake_graph: graph.Graph):
+    assert swan_lake_graph.index is swan_lake_graph.index
+    for edge, processes in swan_lake_graph.index.producers.items():
+        assert processes == [
+            p for p in swan_lake_graph.processes if edge in p.output_edges
+        ]
+
+
+def test_copied_graph_drops_cached_values(swan_lake_graph: graph.Graph):
+    inputs, _, outputs = swan_lake_graph.full_io()
+    compiled = swan_lake_graph.compile_graph("full", *swan_lake_graph.full_io())
+    assert compiled.levels
+    first = next(p for p in swan_lake_graph.processes if p.input_edges == tuple(inputs))
+    copied = swan_lake_graph.model_copy(
+        update={
+            "processes": (first,),
+            "edges": tuple(sorted(first.input_edges + first.output_edges)),
+        }
+    )
+
+    assert copied.full_io() == (list(first.input_edges), [], list(first.output_edges))
+    assert swan_lake_graph.full_io()[2] == outputs
+    copied_compiled = compiled.model_copy(update={"order": (first,)})
+    assert copied_compiled.levels == ((first,),)
+    assert copy.deepcopy(compiled).levels == compiled.levels
+
+
 def test_full_io_return_unique_edges(swan_lake_graph: graph.Graph):
     inputs, middle, outputs = swan_lake_graph.full_io()
     assert len(inputs) == 1
@@ -407,3 +503,603 @@ def test_compile_big_subgraph(
     )
 
     assert compiled == g.compile_graph("subgraph", *g.full_io())
+
+
+def test_process_builds_args(log_provider_factory: log.LogProviderFactory):
+    song = graph.LocalEdge(uri="file://./data/{version}/lyrics.parquet")
+    guitar = graph.Edge(uri="file://./data/guitar.parquet")
+    love = graph.LocalEdge(uri="file://./data/{version}/love.parquet")
+    process = graph.Process(
+        node=graph.Node(
+            name="ballad",
+            cmd=["ls"],
+            log_provider_factory=log_provider_factory,
+        ),
+        flags=["--verbose"],
+        options={"--song": song, "--lyrics": "full"},
+        input_edges=[guitar],
+        output_edges=[love],
+        strip_scheme=True,
+    )
+
+    assert process.build_args("coda") == [
+        "--verbose",
+        "--song",
+        "./data/coda/lyrics.parquet",
+        "--lyrics",
+        "full",
+        "./data/guitar.parquet",
+        "./data/coda/love.parquet",
+    ]
+
+
+def test_run_full_graph(swan_lake_graph: graph.Graph):
+    compiled = swan_lake_graph.compile_graph("swan_lake", *swan_lake_graph.full_io())
+    return_codes = compiled.run("finale", max_concurrency=4)
+
+    assert return_codes == {p.node.name: 0 for p in swan_lake_graph.processes}
+
+
+def test_node_output_goes_to_its_own_log(
+    tmp_path: Path, log_provider_factory: log.LogProviderFactory
+):
+    stdout = sys.stdout
+    nodes = [
+        graph.Node(
+            name=f"voice-{voice}",
+            cmd=[
+                sys.executable,
+                "-c",
+                f"import sys; [print('voice {voice}', i) for i in range(5000)]; "
+                f"sys.stderr.write('voice {voice} done')",
+            ],
+            log_provider_factory=log_provider_factory,
+        )
+        for voice in range(4)
+    ]
+    for metadata in [node.run("canon", []) for node in nodes]:
+        assert metadata.meta.wait() == 0
+        metadata.close()
+
+    assert sys.stdout is stdout
+    for voice in range(4):
+        lines = (tmp_path / f"logs/canon/voice-{voice}.log").read_text().splitlines()
+        assert lines[:-1] == [f"voice {voice} {i}" for i in range(5000)]
+        assert lines[-1] == f"voice {voice} done"
+
+
+def test_run_respects_dependencies(
+    tmp_path: Path, process_factory: Callable[..., graph.Process]
+):
+    record = tmp_path / "record.txt"
+    overture = graph.Edge(uri="file://./data/overture/")
+    strings = graph.Edge(uri="file://./data/{version}/strings/")
+    brass = graph.Edge(uri="file://./data/{version}/brass/")
+    tutti = graph.Edge(uri="file://./data/{version}/tutti/")
+    g = graph.Graph(
+        name="symphony",
+        processes=[
+            process_factory("a-strings", [overture], [strings], record=record),
+            process_factory("b-brass", [overture], [brass], record=record),
+            process_factory("c-tutti", [strings, brass], [tutti], record=record),
+        ],
+        edges=[overture, strings, brass, tutti],
+    )
+    compiled = g.compile_graph("symphony", *g.full_io())
+
+    return_codes = graph.Executor(max_concurrency=1).run(compiled, "largo")
+
+    assert return_codes == {"a-strings": 0, "b-brass": 0, "c-tutti": 0}
+    assert record.read_text().split() == ["a-strings", "b-brass", "c-tutti"]
+
+
+def test_run_stops_downstream_of_failure(
+    tmp_path: Path, process_factory: Callable[..., graph.Process]
+):
+    record = tmp_path / "record.txt"
+    overture = graph.Edge(uri="file://./data/overture/")
+    strings = graph.Edge(uri="file://./data/{version}/strings/")
+    tutti = graph.Edge(uri="file://./data/{version}/tutti/")
+    g = graph.Graph(
+        name="symphony",
+        processes=[
+            process_factory("strings", [overture], [strings], 3, record=record),
+            process_factory("tutti", [strings], [tutti], record=record),
+        ],
+        edges=[overture, strings, tutti],
+    )
+    compiled = g.compile_graph("symphony", *g.full_io())
+
+    assert compiled.run("largo") == {"strings": 3}
+    assert record.read_text().split() == ["strings"]
+
+
+@pytest.mark.parametrize("run_async", [False, True])
+def test_run_survives_a_missing_binary(
+    tmp_path: Path,
+    log_provider_factory: log.LogProviderFactory,
+    run_async: bool,
+    process_factory: Callable[..., graph.Process],
+):
+    record = tmp_path / "record.txt"
+    overture = graph.Edge(uri="file://./data/overture/")
+    strings = graph.Edge(uri="file://./data/{version}/strings/")
+    brass = graph.Edge(uri="file://./data/{version}/brass/")
+    tutti = graph.Edge(uri="file://./data/{version}/tutti/")
+    missing = graph.Process(
+        node=graph.Node(
+            name="strings",
+            cmd=[str(tmp_path / "no-such-binary")],
+            log_provider_factory=log_provider_factory,
+        ),
+        input_edges=[overture],
+        output_edges=[strings],
+    )
+    g = graph.Graph(
+        name="symphony",
+        processes=[
+            missing,
+            process_factory("brass", [overture], [brass], record=record),
+            process_factory("tutti", [strings, brass], [tutti], record=record),
+        ],
+        edges=[overture, strings, brass, tutti],
+    )
+    compiled = g.compile_graph("symphony", *g.full_io())
+    ledger = graph.RunLedger(uri=f"file://{tmp_path}/ledger/")
+    executor = graph.Executor(max_concurrency=2, ledger=ledger)
+
+    if run_async:
+        return_codes = asyncio.run(executor.run_async(compiled, "largo"))
+    else:
+        return_codes = executor.run(compiled, "largo")
+
+    assert return_codes == {"strings": graph.SPAWN_FAILED, "brass": 0}
+    assert record.read_text().split() == ["brass"]
+    runs = ledger.scan(status="failed").to_pylist()
+    assert [(r["process"], r["exit_code"]) for r in runs] == [("strings", 127)]
+    log_text = (tmp_path / "logs/largo/strings.log").read_text()
+    assert "Failed to start strings" in log_text
+
+
+@pytest.mark.parametrize("run_async", [False, True])
+def test_run_does_not_wait_on_grandchildren(
+    tmp_path: Path,
+    log_provider_factory: log.LogProviderFactory,
+    run_async: bool,
+    process_factory: Callable[..., graph.Process],
+):
+    record = tmp_path / "record.txt"
+    grandchild = (
+        "import time; time.sleep(1.5); "
+        f"open({str(record)!r}, 'a').write('echo\\n'); print('echo')"
+    )
+    overture = graph.Edge(uri="file://./data/overture/")
+    strings = graph.Edge(uri="file://./data/{version}/strings/")
+    tutti = graph.Edge(uri="file://./data/{version}/tutti/")
+    strings_process = graph.Process(
+        node=graph.Node(
+            name="strings",
+            cmd=[
+                sys.executable,
+                "-c",
+                "import subprocess, sys; "
+                f"subprocess.Popen([sys.executable, '-c', {grandchild!r}])",
+            ],
+            log_provider_factory=log_provider_factory,
+        ),
+        input_edges=[overture],
+        output_edges=[strings],
+    )
+    g = graph.Graph(
+        name="symphony",
+        processes=[
+            strings_process,
+            process_factory("tutti", [strings], [tutti], record=record),
+        ],
+        edges=[overture, strings, tutti],
+    )
+    compiled = g.compile_graph("symphony", *g.full_io())
+    executor = graph.Executor(max_concurrency=1)
+
+    if run_async:
+        return_codes = asyncio.run(executor.run_async(compiled, "largo"))
+    else:
+        return_codes = executor.run(compiled, "largo")
+
+    assert return_codes == {"strings": 0, "tutti": 0}
+    # tutti ran while the output of strings was still open
+    assert record.read_text().split() == ["tutti", "echo"]
+    # the output is still captured before the run returns
+    assert (tmp_path / "logs/largo/strings.log").read_text() == "echo\n"
+
+
+def test_interrupted_run_stops_its_children(
+    tmp_path: Path, log_provider_factory: log.LogProviderFactory, monkeypatch
+):
+    overture = graph.Edge(uri="file://./data/overture/")
+    finale = graph.Edge(uri="file://./data/{version}/finale/")
+    g = graph.Graph(
+        name="symphony",
+        processes=[
+            graph.Process(
+                node=graph.Node(
+                    name="finale",
+                    cmd=[sys.executable, "-c", "import time; time.sleep(30)"],
+                    log_provider_factory=log_provider_factory,
+                ),
+                input_edges=[overture],
+                output_edges=[finale],
+            )
+        ],
+        edges=[overture, finale],
+    )
+    compiled = g.compile_graph("symphony", *g.full_io())
+    ledger = graph.RunLedger(uri=f"file://{tmp_path}/ledger/")
+
+    def interrupt(self, timeout=None):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(graph.Supervisor, "wait", interrupt)
+    started = time.monotonic()
+    with pytest.raises(KeyboardInterrupt):
+        graph.Executor(ledger=ledger).run(compiled, "largo")
+
+    assert time.monotonic() - started < 10
+    (run,) = ledger.scan().to_pylist()
+    assert run["process"] == "finale"
+    assert run["status"] == "failed"
+    assert run["exit_code"] == -9
+
+
+def test_run_respects_capacity(
+    tmp_path: Path, log_provider_factory: log.LogProviderFactory
+):
+    record = tmp_path / "record.txt"
+    overture = graph.Edge(uri="file://./data/overture/")
+    outputs = {
+        name: graph.Edge(uri=f"file://./data/{{version}}/{name}/")
+        for name in ["tokenize", "ner", "count"]
+    }
+    requests = {
+        "tokenize": resources.Resources(cpus=4),
+        "ner": resources.Resources(cpus=3),
+        "count": resources.Resources(cpus=1),
+    }
+    script = (
+        "import sys, time; open({record!r}, 'a').write('start {name}\\n'); "
+        "time.sleep(0.2); open({record!r}, 'a').write('end {name}\\n')"
+    )
+    g = graph.Graph(
+        name="corpus",
+        processes=[
+            graph.Process(
+                node=graph.Node(
+                    name=name,
+                    cmd=[
+                        sys.executable,
+                        "-c",
+                        script.format(record=str(record), name=name),
+                    ],
+                    log_provider_factory=log_provider_factory,
+                ),
+                input_edges=[overture],
+                output_edges=[output],
+                resources=requests[name],
+            )
+            for name, output in outputs.items()
+        ],
+        edges=[overture, *outputs.values()],
+    )
+    compiled = g.compile_graph("corpus", *g.full_io())
+
+    executor = graph.Executor(4, capacity=resources.Resources(cpus=4))
+    assert executor.run(compiled, "largo") == {"count": 0, "ner": 0, "tokenize": 0}
+    # the largest request goes first, ner and count share the machine after it
+    assert record.read_text().splitlines()[:2] == ["start tokenize", "end tokenize"]
+    assert sorted(record.read_text().splitlines()[2:4]) == ["start count", "start ner"]
+
+
+def test_critical_path(swan_lake_graph: graph.Graph):
+    compiled = swan_lake_graph.compile_graph("full", *swan_lake_graph.full_io())
+    lengths = {p.node.name: length for p, length in compiled.critical_path().items()}
+    # scene-no-1, waltz-no-2, scene-pas-de-trois, presto, pass-de-deux, ...
+    assert lengths["scene-no-1"] == 7
+    assert lengths["scene-no-3"] == 5
+    assert lengths["dance-with-goblets"] == 1
+
+    lengths = {
+        p.node.name: length
+        for p, length in compiled.critical_path(
+            {"scene-no-3": 30, "presto": 10}
+        ).items()
+    }
+    # unknown durations take the mean of the known ones
+    assert lengths["scene-no-3"] == 30 + 10 + 3 * 20
+    assert lengths["scene-no-1"] == 20 + lengths["waltz-no-2"]
+
+
+def test_run_starts_longest_path_first(
+    tmp_path: Path, process_factory: Callable[..., graph.Process]
+):
+    record = tmp_path / "record.txt"
+    overture = graph.Edge(uri="file://./data/overture/")
+    chain = [graph.Edge(uri=f"file://./data/{{version}}/chain-{i}/") for i in range(3)]
+    solos = [graph.Edge(uri=f"file://./data/{{version}}/solo-{i}/") for i in range(2)]
+    processes = [
+        process_factory(f"a-solo-{i}", [overture], [solo], record=record)
+        for i, solo in enumerate(solos)
+    ]
+    processes += [
+        process_factory(
+            f"chain-{i}", [chain[i - 1] if i else overture], [edge], record=record
+        )
+        for i, edge in enumerate(chain)
+    ]
+    g = graph.Graph(name="fugue", processes=processes, edges=[overture, *chain, *solos])
+    compiled = g.compile_graph("fugue", *g.full_io())
+
+    graph.Executor(max_concurrency=1).run(compiled, "largo")
+    assert record.read_text().split()[0] == "chain-0"
+
+    record.unlink()
+    durations = {"a-solo-0": 10, "a-solo-1": 10, "chain-0": 1, "chain-1": 1}
+    graph.Executor(max_concurrency=1, durations=durations).run(compiled, "largo")
+    assert record.read_text().split()[:2] == ["a-solo-0", "a-solo-1"]
+
+
+def test_node_runs_async(log_provider_factory: log.LogProviderFactory):
+    node = graph.Node(
+        name="nocturne",
+        cmd=[sys.executable, "-c", "import sys; sys.exit(2)"],
+        log_provider_factory=log_provider_factory,
+    )
+
+    async def play():
+        metadata = await node.run_async("opus_9", [])
+        return_code = await node.wait_async(metadata)
+        assert node.heartbeat(metadata, "opus_9") == return_code
+        return return_code
+
+    assert asyncio.run(play()) == 2
+
+
+def test_run_full_graph_async(swan_lake_graph: graph.Graph):
+    compiled = swan_lake_graph.compile_graph("swan_lake", *swan_lake_graph.full_io())
+    return_codes = asyncio.run(compiled.run_async("finale", max_concurrency=4))
+
+    assert return_codes == {p.node.name: 0 for p in swan_lake_graph.processes}
+
+
+def test_run_async_respects_dependencies(
+    tmp_path: Path, process_factory: Callable[..., graph.Process]
+):
+    record = tmp_path / "record.txt"
+    overture = graph.Edge(uri="file://./data/overture/")
+    strings = graph.Edge(uri="file://./data/{version}/strings/")
+    brass = graph.Edge(uri="file://./data/{version}/brass/")
+    tutti = graph.Edge(uri="file://./data/{version}/tutti/")
+    g = graph.Graph(
+        name="symphony",
+        processes=[
+            process_factory("a-strings", [overture], [strings], 1, record=record),
+            process_factory("b-brass", [overture], [brass], record=record),
+            process_factory("c-tutti", [strings, brass], [tutti], record=record),
+        ],
+        edges=[overture, strings, brass, tutti],
+    )
+    compiled = g.compile_graph("symphony", *g.full_io())
+
+    executor = graph.Executor(max_concurrency=1)
+    return_codes = asyncio.run(executor.run_async(compiled, "largo"))
+
+    assert return_codes == {"a-strings": 1, "b-brass": 0}
+    assert record.read_text().split() == ["a-strings", "b-brass"]
+
+
+def test_graph_index_tracks_option_edges(
+    log_provider_factory: log.LogProviderFactory,
+):
+    guitar = graph.Edge(uri="file://./data/guitar.parquet")
+    chords = graph.Edge(uri="file://./data/chords.parquet")
+    song = graph.LocalEdge(uri="file://./data/{version}/song.parquet")
+    reggae = graph.Process(
+        node=graph.Node(
+            name="reggae",
+            cmd=["ls"],
+            log_provider_factory=log_provider_factory,
+        ),
+        options={"--chords": chords},
+        input_edges=[guitar],
+        output_edges=[song],
+    )
+    index = graph.GraphIndex((reggae,))
+
+    assert index.producers == {song: [reggae]}
+    assert index.consumers == {guitar: [reggae]}
+    assert index.attached == {song: [reggae], guitar: [reggae], chords: [reggae]}
+
+    with pytest.raises(ValidationError):
+        graph.Graph(name="riddim", processes=[reggae], edges=[guitar, song])
+
+
+def test_compile_is_memoized(swan_lake_graph: graph.Graph):
+    inputs, middle, outputs = swan_lake_graph.full_io()
+    compiled = swan_lake_graph.compile_graph("swan_lake", inputs, middle, outputs)
+
+    again = swan_lake_graph.compile_graph(
+        "swan_lake", inputs[::-1], middle[::-1], outputs[::-1]
+    )
+    assert again is compiled
+    assert swan_lake_graph.compile_graph("lake", inputs, middle, outputs) == (
+        compiled.model_copy(update={"name": "lake"})
+    )
+
+
+def test_compile_memo_is_bounded(swan_lake_graph: graph.Graph, monkeypatch):
+    monkeypatch.setattr(graph, "COMPILED_CACHE_SIZE", 2)
+    io = swan_lake_graph.full_io()
+    first = swan_lake_graph.compile_graph("premiere", *io)
+    swan_lake_graph.compile_graph("reprise", *io)
+    assert swan_lake_graph.compile_graph("premiere", *io) is first
+    swan_lake_graph.compile_graph("matinee", *io)
+
+    # the least recently used one goes
+    assert [key[0] for key in swan_lake_graph._compiled] == ["premiere", "matinee"]
+    assert swan_lake_graph.compile_graph("premiere", *io) is first
+    copied = swan_lake_graph.model_copy()
+    assert copied.compile_graph("premiere", *io) is not first
+
+
+def test_compiled_levels_are_topological(swan_lake_graph: graph.Graph):
+    compiled = swan_lake_graph.compile_graph("swan_lake", *swan_lake_graph.full_io())
+    names = [[p.node.name for p in level] for level in compiled.levels]
+
+    assert names == [
+        ["scene-no-1"],
+        ["scene-no-3", "waltz-no-2"],
+        ["scene-pas-de-trois"],
+        ["allegro-no-4", "andante-sostenuto", "presto"],
+        ["pass-de-deux"],
+        ["sujet-no-7"],
+        ["dance-with-goblets"],
+    ]
+    seen = set()
+    for process in compiled.topological_order:
+        assert compiled.dependencies()[process] <= seen
+        seen.add(process)
+    assert len(seen) == len(compiled.order)
+
+
+def test_cyclic_graph_is_invalid(log_provider_factory: log.LogProviderFactory):
+    score = graph.Edge(uri="file://./data/score.parquet")
+    canon = graph.LocalEdge(uri="file://./data/{version}/canon.parquet")
+    fugue = graph.LocalEdge(uri="file://./data/{version}/fugue.parquet")
+    finale = graph.LocalEdge(uri="file://./data/{version}/finale.parquet")
+    processes = [
+        graph.Process(
+            node=graph.Node(
+                name="canon",
+                cmd=["ls"],
+                log_provider_factory=log_provider_factory,
+            ),
+            input_edges=[score, fugue],
+            output_edges=[canon],
+        ),
+        graph.Process(
+            node=graph.Node(
+                name="fugue",
+                cmd=["ls"],
+                log_provider_factory=log_provider_factory,
+            ),
+            input_edges=[canon],
+            output_edges=[fugue, finale],
+        ),
+    ]
+    with pytest.raises(ValidationError, match="cycle"):
+        graph.Graph(
+            name="bach",
+            processes=processes,
+            edges=[score, canon, fugue, finale],
+        )
+
+
+@pytest.fixture
+def opera_edges(tmp_path: Path) -> dict[str, graph.Edge]:
+    (tmp_path / "libretto.txt").write_text("libretto")
+    (tmp_path / "tosca").mkdir()
+    edges = {"libretto": graph.Edge(uri=f"file://{tmp_path}/libretto.txt")}
+    for stage in ["act-1", "act-2", "act-3", "encore"]:
+        edges[stage] = graph.LocalEdge(uri=f"file://{tmp_path}/{{version}}/{stage}")
+    return edges
+
+
+def _opera(
+    edges: dict[str, graph.Edge],
+    process_factory: Callable[..., graph.Process],
+    act_2_exit_code: int = 0,
+) -> graph.Graph:
+    return graph.Graph(
+        name="opera",
+        processes=[
+            process_factory(
+                "act-1", [edges["libretto"]], [edges["act-1"]], writes=True
+            ),
+            process_factory(
+                "act-2",
+                [edges["act-1"]],
+                [edges["act-2"]],
+                act_2_exit_code,
+                writes=True,
+            ),
+            process_factory("act-3", [edges["act-2"]], [edges["act-3"]], writes=True),
+            process_factory("encore", [edges["act-1"]], [edges["encore"]], writes=True),
+        ],
+        edges=list(edges.values()),
+    )
+
+
+def test_compile_upstream_cone(
+    tmp_path: Path,
+    opera_edges: dict[str, graph.Edge],
+    process_factory: Callable[..., graph.Process],
+):
+    opera = _opera(opera_edges, process_factory)
+
+    compiled = opera.compile_upstream("finale", [opera_edges["act-3"]])
+    assert [p.node.name for p in compiled.order] == ["act-1", "act-2", "act-3"]
+    assert compiled.input_edges == (opera_edges["libretto"],)
+
+    # existing intermediate edges cut the graph
+    (tmp_path / "tosca/act-1").write_text("act-1")
+    compiled = opera.compile_upstream("finale", [opera_edges["act-3"]], "tosca")
+    assert [p.node.name for p in compiled.order] == ["act-2", "act-3"]
+    assert compiled.input_edges == (opera_edges["act-1"],)
+
+    compiled = opera.compile_upstream(
+        "finale", [opera_edges["act-3"]], "tosca", stale=[opera_edges["act-1"]]
+    )
+    assert [p.node.name for p in compiled.order] == ["act-1", "act-2", "act-3"]
+
+    with pytest.raises(AssertionError, match="not produced by any process"):
+        opera.compile_upstream("finale", [opera_edges["libretto"]])
+
+
+def test_compile_upstream_keeps_unlistable_edges(
+    tmp_path: Path, process_factory: Callable[..., graph.Process]
+):
+    libretto = graph.Edge(uri=f"file://{tmp_path}/libretto.txt")
+    score = graph.Edge(uri="http://example.com/{version}/score")
+    finale = graph.LocalEdge(uri=f"file://{tmp_path}/{{version}}/finale")
+    opera = graph.Graph(
+        name="opera",
+        processes=[
+            process_factory("compose", [libretto], [score]),
+            process_factory("perform", [score], [finale]),
+        ],
+        edges=[libretto, score, finale],
+    )
+
+    compiled = opera.compile_upstream("finale", [finale], "tosca")
+    assert sorted(p.node.name for p in compiled.order) == ["compose", "perform"]
+
+
+def test_compile_resume_after_failure(
+    tmp_path: Path,
+    opera_edges: dict[str, graph.Edge],
+    process_factory: Callable[..., graph.Process],
+):
+    opera = _opera(opera_edges, process_factory, act_2_exit_code=1)
+    compiled = opera.compile_graph("opera", *opera.full_io())
+
+    return_codes = compiled.run("tosca")
+    assert return_codes == {"act-1": 0, "act-2": 1, "encore": 0}
+    assert (tmp_path / "tosca/act-2").exists()  # partial output of the failure
+
+    failed = [name for name, code in return_codes.items() if code != 0]
+    resumed = opera.compile_resume("resume", compiled, "tosca", failed)
+    assert [p.node.name for p in resumed.order] == ["act-2", "act-3"]
+    assert resumed.input_edges == (opera_edges["act-1"],)
+
+    # nothing is left once every output exists
+    (tmp_path / "tosca/act-3").write_text("act-3")
+    assert opera.compile_resume("resume", compiled, "tosca").order == ()
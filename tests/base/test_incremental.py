@@ -0,0 +1,92 @@
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from harmonia.base import graph, incremental
+
+
+@pytest.fixture
+def ner_graph(tmp_path: Path, process_factory: Callable[..., graph.Process]):
+    record = tmp_path / "record.txt"
+    pubmed = graph.Edge(uri=f"file://{tmp_path}/pubmed.txt")
+    dictionary = graph.Edge(uri=f"file://{tmp_path}/dictionary.txt")
+    cache = graph.LocalEdge(uri=f"file://{tmp_path}/{{version}}/cache.txt")
+    tokens = graph.LocalEdge(uri=f"file://{tmp_path}/{{version}}/tokens.txt")
+    ner = graph.LocalEdge(uri=f"file://{tmp_path}/{{version}}/ner.txt")
+    (tmp_path / "pubmed.txt").write_text("abstracts")
+    (tmp_path / "dictionary.txt").write_text("genes")
+    (tmp_path / "cantata").mkdir()
+    (tmp_path / "fugue").mkdir()
+    g = graph.Graph(
+        name="ner",
+        processes=[
+            process_factory("unzip", [pubmed], [cache], record=record, writes=True),
+            process_factory("tokenize", [cache], [tokens], record=record, writes=True),
+            process_factory(
+                "ner", [tokens, dictionary], [ner], record=record, writes=True
+            ),
+        ],
+        edges=[pubmed, dictionary, cache, tokens, ner],
+    )
+    return g.compile_graph("ner", *g.full_io()), record
+
+
+def test_fingerprint_uri(tmp_path: Path):
+    assert incremental.fingerprint_uri(f"file://{tmp_path}/missing") is None
+    assert incremental.fingerprint_uri("s3://bucket/score") is None
+
+    (tmp_path / "score").mkdir()
+    (tmp_path / "score/violin.txt").write_text("allegro")
+    uri = f"file://{tmp_path}/score"
+    by_stat = incremental.fingerprint_uri(uri)
+    by_content = incremental.fingerprint_uri(uri, content_hash=True)
+    assert by_stat == incremental.fingerprint_uri(uri)
+    assert by_content == incremental.fingerprint_uri(uri, content_hash=True)
+
+    (tmp_path / "score/viola.txt").write_text("adagio")
+    assert incremental.fingerprint_uri(uri) != by_stat
+    assert incremental.fingerprint_uri(uri, content_hash=True) != by_content
+
+
+def test_manifest_roundtrip(tmp_path: Path):
+    provider = incremental.ManifestProvider(
+        uri=f"file://{tmp_path}/manifest/{{version}}.json"
+    )
+    assert provider.read("cantata") == incremental.Manifest()
+
+    manifest = incremental.Manifest(
+        processes={"aria": incremental.ProcessFingerprint(inputs="a", outputs="b")}
+    )
+    provider.write("cantata", manifest)
+    assert provider.read("cantata") == manifest
+
+
+@pytest.mark.parametrize("content_hash", [False, True])
+def test_incremental_run_skips_unchanged(tmp_path: Path, ner_graph, content_hash):
+    compiled, record = ner_graph
+    provider = incremental.ManifestProvider(
+        uri=f"file://{tmp_path}/manifest/{{version}}.json",
+        content_hash=content_hash,
+    )
+    executor = graph.Executor(manifest_provider=provider)
+    all_done = {"unzip": 0, "tokenize": 0, "ner": 0}
+
+    assert executor.run(compiled, "cantata") == all_done
+    assert record.read_text().split() == ["unzip", "tokenize", "ner"]
+
+    assert executor.run(compiled, "cantata") == all_done
+    assert record.read_text().split() == ["unzip", "tokenize", "ner"]
+
+    (tmp_path / "dictionary.txt").write_text("genes and proteins")
+    assert executor.run(compiled, "cantata") == all_done
+    assert record.read_text().split() == ["unzip", "tokenize", "ner", "ner"]
+
+    # other versions and missing outputs run again
+    executor.run(compiled, "fugue")
+    assert record.read_text().split()[4:] == ["unzip", "tokenize", "ner"]
+    (tmp_path / "cantata/tokens.txt").unlink()
+    executor.run(compiled, "cantata")
+    # the same tokens are rewritten, only new timestamps trigger the next step
+    rerun = ["tokenize"] if content_hash else ["tokenize", "ner"]
+    assert record.read_text().split()[7:] == rerun
@@ -0,0 +1,95 @@
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+from harmonia.base import filesystem, graph, ledger
+
+OPENING = datetime(2024, 6, 17, 20, 0, tzinfo=UTC)
+
+
+def _record(version: str, process: str, status: str, **kwargs) -> dict:
+    record = {
+        "graph": "swan-lake",
+        "compiled": "full",
+        "version": version,
+        "process": process,
+        "status": status,
+        "start": OPENING,
+        "end": OPENING + timedelta(minutes=1),
+        "exit_code": 0 if status == "success" else 1,
+    }
+    record.update(kwargs)
+    return record
+
+
+def test_empty_ledger_scans(tmp_path: Path):
+    runs = ledger.RunLedger(uri=f"file://{tmp_path}/ledger/").scan()
+    assert runs.schema == ledger.RUN_SCHEMA
+    assert runs.num_rows == 0
+
+
+def test_ledger_filters_runs(tmp_path: Path):
+    run_ledger = ledger.RunLedger(uri=f"file://{tmp_path}/ledger/")
+    run_ledger.append(
+        [
+            _record("premiere", "overture", "success"),
+            _record("premiere", "waltz", "failed"),
+            _record("reprise", "overture", "success", graph="nutcracker"),
+        ]
+    )
+    run_ledger.append(
+        [_record("reprise", "waltz", "success", start=OPENING + timedelta(days=1))]
+    )
+
+    assert run_ledger.scan().num_rows == 4
+    assert run_ledger.scan(graph_name="nutcracker").column("process").to_pylist() == [
+        "overture"
+    ]
+    failed = run_ledger.scan(graph_name="swan-lake", status="failed")
+    assert failed.to_pylist() == [_record("premiere", "waltz", "failed")]
+    later = run_ledger.scan(since=OPENING + timedelta(hours=1))
+    assert later.column("version").to_pylist() == ["reprise"]
+
+    run_ledger.compact("swan-lake")
+    parts = list((tmp_path / "ledger/graph=swan-lake").iterdir())
+    assert len(parts) == 1
+    assert run_ledger.scan(graph_name="swan-lake").num_rows == 3
+
+
+def test_object_store_ledger_reuses_its_filesystem(tmp_path: Path):
+    run_ledger = ledger.RunLedger(uri=f"mock://{tmp_path}/ledger/")
+    run_ledger.append([_record("premiere", "overture", "success")])
+    run_ledger.append([_record("reprise", "overture", "success")])
+
+    pooled, _ = filesystem.FILESYSTEMS.resolve(run_ledger.uri)
+    assert run_ledger._filesystem()[0] is pooled
+    assert run_ledger.scan(version="reprise").num_rows == 1
+
+
+def test_executor_records_runs(tmp_path: Path, swan_lake_graph: graph.Graph):
+    run_ledger = ledger.RunLedger(uri=f"file://{tmp_path}/ledger/")
+    compiled = swan_lake_graph.compile_graph("full", *swan_lake_graph.full_io())
+    graph.Executor(ledger=run_ledger).run(compiled, "premiere")
+
+    runs = run_ledger.scan(graph_name="swan-lake", version="premiere")
+    assert sorted(runs.column("process").to_pylist()) == sorted(
+        p.node.name for p in swan_lake_graph.processes
+    )
+    assert set(runs.column("status").to_pylist()) == {"success"}
+    assert set(runs.column("compiled").to_pylist()) == {"full"}
+    for run in runs.to_pylist():
+        assert run["start"] <= run["end"]
+
+
+def test_mean_durations(tmp_path: Path):
+    run_ledger = ledger.RunLedger(uri=f"file://{tmp_path}/ledger/")
+    run_ledger.append(
+        [
+            _record("premiere", "presto", "success"),
+            _record("reprise", "presto", "success", end=OPENING + timedelta(minutes=3)),
+            _record("premiere", "waltz", "success", end=OPENING + timedelta(seconds=1)),
+        ]
+    )
+
+    durations = ledger.mean_durations(run_ledger.scan(status="success"))
+    assert durations == {"presto": 120.0, "waltz": 1.0}
+    assert ledger.mean_durations(run_ledger.scan(status="failed")) == {}
@@ -1,6 +1,10 @@
+import gzip
 import os
+import time
+from datetime import UTC, datetime
 from pathlib import Path
 
+import pyarrow.compute as pc
 import pytest
 
 from harmonia.base import log
@@ -69,6 +73,131 @@ def test_log_provider_factory(tmp_path: Path):
     assert "vivaldi\n" in value
 
 
+def test_buffered_log_flushes_on_close(tmp_path: Path):
+    log_file = tmp_path / "fugue.log"
+
+    log_provider = log.LogProvider(
+        uri=f"file://{log_file}", buffered=True, flush_interval=60
+    )
+    for bar in range(1000):
+        log_provider.msg(f"bar {bar}")
+    del log_provider
+
+    lines = log_file.read_text().splitlines()
+    assert [line.split(" | ")[1] for line in lines] == [
+        f"bar {bar}" for bar in range(1000)
+    ]
+
+
+def test_buffered_log_flushes_on_size(tmp_path: Path):
+    log_file = tmp_path / "canon.log"
+
+    log_provider = log.LogProvider(
+        uri=f"file://{log_file}", buffered=True, flush_size=10, flush_interval=60
+    )
+    log_provider.msg("stretto")
+    for _ in range(100):
+        if log_file.read_text():
+            break
+        time.sleep(0.01)
+    assert "stretto\n" in log_file.read_text()
+    log_provider.close()
+
+
+class FlakyHandle:
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.text = ""
+
+    def write(self, text: str):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("Log store is flaky")
+        self.text += text
+
+    def flush(self):
+        pass
+
+
+def test_buffered_writer_retries_a_failed_batch():
+    handle = FlakyHandle(failures=1)
+    writer = log.BufferedWriter(handle, flush_interval=0.01)
+    writer.write("pas de deux\n")
+    for _ in range(100):
+        if handle.text:
+            break
+        time.sleep(0.01)
+    writer.write("coda\n")
+    writer.close()
+    assert handle.text == "pas de deux\ncoda\n"
+
+
+def test_buffered_writer_raises_what_it_failed_to_write():
+    handle = FlakyHandle(failures=1000)
+    writer = log.BufferedWriter(handle, flush_interval=0.01)
+    writer.write("pas de deux\n")
+    with pytest.raises(OSError, match="flaky"):
+        for _ in range(100):
+            time.sleep(0.01)
+            writer.write("coda\n")
+    with pytest.raises(OSError, match="flaky"):
+        writer.close()
+    assert handle.text == ""
+
+
+def test_compressed_log(tmp_path: Path):
+    log_file = tmp_path / "requiem.log.gz"
+
+    log_provider = log.LogProvider(uri=f"file://{log_file}", buffered=True)
+    for bar in range(1000):
+        log_provider.msg(f"lacrimosa {bar}")
+    log_provider.close()
+
+    with gzip.open(log_file, "rt") as f:
+        assert len(f.read().splitlines()) == 1000
+
+
+def test_rotated_log(tmp_path: Path):
+    log_file = tmp_path / "bolero.log.gz"
+
+    log_provider = log.LogProvider(uri=f"file://{log_file}", max_bytes=100, keep=2)
+    for bar in range(10):
+        log_provider.write(f"{bar:049d}\n")
+    log_provider.close()
+
+    segments = sorted(p.name for p in tmp_path.iterdir())
+    assert segments == ["bolero.log.1.gz", "bolero.log.2.gz", "bolero.log.gz"]
+    with gzip.open(tmp_path / "bolero.log.2.gz", "rt") as f:
+        assert f.read().split() == [f"{4:049d}", f"{5:049d}"]
+    with gzip.open(log_file, "rt") as f:
+        assert f.read().split() == [f"{8:049d}", f"{9:049d}"]
+
+
+def test_rotation_counts_encoded_bytes(tmp_path: Path):
+    log_file = tmp_path / "ecossaise.log"
+
+    log_provider = log.LogProvider(uri=f"file://{log_file}", max_bytes=100, keep=5)
+    for _ in range(4):
+        log_provider.write("é" * 30 + "\n")  # 31 characters, 61 bytes
+    log_provider.close()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "ecossaise.log",
+        "ecossaise.log.1",
+    ]
+
+
+def test_only_local_logs_rotate():
+    with pytest.raises(ValueError):
+        log.LogProvider(uri="s3://ballet/bolero.log", max_age=60)
+
+
+def test_timestamp():
+    before = datetime.now(UTC)
+    stamp = datetime.fromisoformat(log.timestamp())
+    assert before <= stamp <= datetime.now(UTC)
+
+
 def test_log_param():
     log.TEST_METRIC.log_param("momentum", "adaptive")
     log.TEST_METRIC.log_param("learning_rate", "0.01")
@@ -130,3 +259,110 @@ def test_log_metric_through_logger(tmp_path: Path):
 def test_metric_provider_bad_uri():
     with pytest.raises(ValueError):
         log.MetricProvider(uri="bad_tone")
+
+
+@pytest.mark.parametrize("extension", ["parquet", "arrow"])
+def test_streaming_metric_provider(tmp_path: Path, extension: str):
+    factory = log.MetricFactory(
+        uri=f"file://{tmp_path}/{{version}}/{{name}}.{extension}"
+    )
+    metric_provider = factory.build("piacere", "tempo")
+    assert isinstance(metric_provider, log.StreamingMetricProvider)
+    metric_provider.batch_size = 100
+    metric_provider.log_param("momentum", "adaptive")
+    for step in range(250):
+        metric_provider.log_metric("loss", 1 / (step + 1))
+        metric_provider.log_metric("lr", 0.01)
+
+    summary = metric_provider.summary().to_pylist()
+    assert summary[0] == {
+        "metric": "loss",
+        "min": 1 / 250,
+        "max": 1.0,
+        "mean": pytest.approx(sum(1 / (s + 1) for s in range(250)) / 250),
+        "last": 1 / 250,
+        "count": 250,
+    }
+    assert summary[1]["metric"] == "lr"
+    assert summary[1]["count"] == 250
+    del metric_provider
+
+    metrics = log.read_metrics(f"file://{tmp_path}/piacere/tempo.{extension}")
+    assert metrics.num_rows == 500
+    assert metrics.schema.remove_metadata() == log.METRIC_SCHEMA
+    assert log.metric_params(metrics) == {"momentum": "adaptive"}
+    loss = metrics.filter(pc.equal(metrics["metric"], "loss"))
+    assert loss["step"].to_pylist() == list(range(250))
+
+
+def test_streamed_metrics_can_be_read_back(tmp_path: Path):
+    metric_provider = log.StreamingMetricProvider(
+        f"file://{tmp_path}/grave.arrow", batch_size=10
+    )
+    assert metric_provider.summary().num_rows == 0
+    assert metric_provider.get_metric("loss") == []
+    for step in range(25):
+        metric_provider.log_metric("loss", step)
+    metric_provider.log_metric("lr", 0.01)
+
+    assert metric_provider.get_metric("loss") == list(range(25))
+    assert metric_provider.metrics == {"loss": list(range(25)), "lr": [0.01]}
+    metric_provider.close()
+    assert metric_provider.get_metric("lr") == [0.01]
+
+
+def test_streamed_arrow_metrics_survive_a_crash(tmp_path: Path):
+    metrics_file = tmp_path / "adagio.arrow"
+    metric_provider = log.StreamingMetricProvider(
+        f"file://{metrics_file}", batch_size=10
+    )
+    for step in range(25):
+        metric_provider.log_metric("loss", step)
+    metric_provider.handle.flush()
+    # a crash never closes the stream and may leave a partial batch behind
+    crashed_file = tmp_path / "crashed.arrow"
+    crashed_file.write_bytes(metrics_file.read_bytes() + b"\xff\xff\xff\xff\x10\x00")
+
+    assert log.read_metrics(f"file://{crashed_file}").num_rows == 20
+
+
+def test_streaming_metric_provider_bad_uri():
+    with pytest.raises(ValueError):
+        log.StreamingMetricProvider(uri="file://adagio.metrics")
+
+
+def test_template_pattern():
+    pattern = log.template_pattern("{version}/{name}/{name}.arrow")
+    match = pattern.match("opus-1/flute/flute.arrow")
+    assert match.groupdict() == {"version": "opus-1", "name": "flute"}
+    assert pattern.match("opus-1/flute/oboe.arrow") is None
+
+
+@pytest.mark.parametrize("extension", ["parquet", "arrow"])
+def test_scan_metrics_across_versions(tmp_path: Path, extension: str):
+    factory = log.MetricFactory(
+        uri=f"file://{tmp_path}/logs/{{version}}/{{name}}.{extension}"
+    )
+    for version in ["opus-1", "opus-2", "opus-3"]:
+        for name in ["flute", "oboe"]:
+            metric_provider = factory.build(version, name)
+            metric_provider.log_metric("loss", 0.5)
+            metric_provider.log_metric("pitch", 440.0)
+            metric_provider.close()
+    (tmp_path / "logs/opus-1/notes.txt").write_text("not metrics")
+
+    everything = factory.scan()
+    assert everything.schema == log.SCANNED_METRIC_SCHEMA
+    assert everything.num_rows == 12
+
+    loss = factory.scan(metrics=["loss"], names=["oboe"], min_version="opus-2")
+    assert loss.select(["version", "name", "metric", "value"]).to_pylist() == [
+        {"version": "opus-2", "name": "oboe", "metric": "loss", "value": 0.5},
+        {"version": "opus-3", "name": "oboe", "metric": "loss", "value": 0.5},
+    ]
+    assert factory.scan(max_version="opus-0").num_rows == 0
+
+
+def test_scan_needs_streamed_metrics():
+    with pytest.raises(ValueError):
+        log.DEFAULT_METRIC_FACTORY.scan()
@@ -0,0 +1,58 @@
+from pathlib import Path
+
+from harmonia.base import probe
+
+
+def test_split_uri():
+    assert probe.split_uri("file://./data/score/") == ("file://./data", "score")
+    assert probe.split_uri("file://score.txt") == ("file://", "score.txt")
+    assert probe.split_uri("file:///score.txt") == ("file:///", "score.txt")
+    assert probe.split_uri("s3://bucket/act/score") == ("s3://bucket/act", "score")
+
+
+def test_probe_lists_each_prefix_once(tmp_path: Path, monkeypatch):
+    (tmp_path / "act-1").mkdir()
+    (tmp_path / "act-1/overture.txt").write_text("overture")
+    (tmp_path / "act-1/waltz").mkdir()
+    edge_probe = probe.EdgeProbe(ttl=60)
+    listed = []
+    list_prefix = edge_probe._list
+    monkeypatch.setattr(
+        edge_probe, "_list", lambda prefix: listed.append(prefix) or list_prefix(prefix)
+    )
+
+    uris = [
+        f"file://{tmp_path}/act-1/overture.txt",
+        f"file://{tmp_path}/act-1/waltz/",
+        f"file://{tmp_path}/act-1/finale.txt",
+        f"file://{tmp_path}/act-2/finale.txt",
+    ]
+    assert edge_probe.exists(uris) == dict(zip(uris, [True, True, False, False]))
+    assert sorted(listed) == [f"file://{tmp_path}/act-1", f"file://{tmp_path}/act-2"]
+
+    # cached listings do not see new files until invalidated
+    (tmp_path / "act-1/finale.txt").write_text("finale")
+    assert edge_probe.exists(uris[2:3]) == {uris[2]: False}
+    edge_probe.invalidate(uris[2])
+    assert edge_probe.exists(uris[2:3]) == {uris[2]: True}
+    assert len(listed) == 3
+
+
+def test_probe_expires_listings(tmp_path: Path):
+    edge_probe = probe.EdgeProbe(ttl=0)
+    uri = f"file://{tmp_path}/coda.txt"
+    assert edge_probe.exists([uri]) == {uri: False}
+    (tmp_path / "coda.txt").write_text("coda")
+    assert edge_probe.exists([uri]) == {uri: True}
+
+
+def test_probe_lists_through_pyarrow(tmp_path: Path):
+    (tmp_path / "aria.txt").write_text("aria")
+    edge_probe = probe.EdgeProbe()
+    uris = [f"local://{tmp_path}/aria.txt", f"local://{tmp_path}/recitative.txt"]
+
+    assert edge_probe.exists(uris) == dict(zip(uris, [True, False]))
+    # unknown, hence produced again
+    assert edge_probe.exists(["http://example.com/aria.txt"]) == {
+        "http://example.com/aria.txt": False
+    }
@@ -0,0 +1,51 @@
+from pathlib import Path
+
+from harmonia.base import resources
+
+
+def test_resources_are_immutable_and_serialisable():
+    request = resources.Resources(cpus=2, custom={"gpu_slots": 1})
+    assert request.custom == (("gpu_slots", 1.0),)
+    assert resources.Resources.model_validate_json(request.model_dump_json()) == (
+        request
+    )
+
+
+def test_detect_capacity(tmp_path: Path, monkeypatch):
+    meminfo = tmp_path / "meminfo"
+    meminfo.write_text("MemTotal:       16384 kB\nMemFree:         1024 kB\n")
+    monkeypatch.setattr(resources, "MEMINFO", str(meminfo))
+    capacity = resources.detect_capacity()
+    assert capacity.cpus >= 1
+    assert capacity.memory == 16384 * 1024
+
+    monkeypatch.setattr(resources, "MEMINFO", str(tmp_path / "missing"))
+    assert resources.detect_capacity().memory == 0
+
+
+def test_resource_pool():
+    pool = resources.ResourcePool(
+        resources.Resources(cpus=4, memory=100, custom={"gpu_slots": 1})
+    )
+    tokenize = resources.Resources(cpus=4)
+    ner = resources.Resources(cpus=2, memory=50, custom={"gpu_slots": 1})
+    untracked = resources.Resources(custom={"s3_connections": 8})
+
+    assert pool.share(tokenize) == 1
+    assert pool.share(ner) == 1
+    assert pool.share(untracked) == 0
+    pool.acquire(tokenize)
+    assert not pool.fits(ner)
+    assert pool.fits(untracked)
+    pool.release(tokenize)
+    pool.acquire(ner)
+    assert not pool.fits(ner)
+    assert pool.fits(resources.Resources(cpus=2, memory=50))
+
+
+def test_oversized_request_runs_alone():
+    pool = resources.ResourcePool(resources.Resources(cpus=2))
+    huge = resources.Resources(cpus=64)
+    assert pool.fits(huge)
+    pool.acquire(huge)
+    assert not pool.fits(resources.Resources(cpus=1))
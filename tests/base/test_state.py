@@ -0,0 +1,360 @@
+import json
+from datetime import UTC, datetime
+from pathlib import Path
+
+import pytest
+
+from harmonia.base import graph, journal, state
+
+
+@pytest.fixture
+def state_provider(tmp_path: Path) -> state.StateProvider:
+    for directory in ["graph", "compiled/swan-lake", "run/swan-lake/full"]:
+        (tmp_path / "state" / directory).mkdir(parents=True)
+    return state.StateProvider(
+        graph_uri=f"file://{tmp_path}/state/graph/",
+        compiled_uri=f"file://{tmp_path}/state/compiled/",
+        running_uri=f"file://{tmp_path}/state/run/",
+        ledger_uri=f"file://{tmp_path}/state/ledger/",
+    )
+
+
+def test_graph_roundtrip(
+    state_provider: state.StateProvider, swan_lake_graph: graph.Graph
+):
+    state_provider.write_graph(swan_lake_graph)
+
+    assert state_provider.list_graphs() == ["swan-lake"]
+    assert state_provider.read_graph("swan-lake") == swan_lake_graph
+
+
+def test_compiled_and_running_roundtrip(
+    state_provider: state.StateProvider, swan_lake_graph: graph.Graph
+):
+    compiled = swan_lake_graph.compile_graph("full", *swan_lake_graph.full_io())
+    state_provider.write_compiled("swan-lake", compiled)
+    state_provider.write_running("swan-lake", "full", "premiere", swan_lake_graph)
+
+    assert state_provider.list_compiled("swan-lake") == ["full"]
+    assert state_provider.read_compiled("swan-lake", "full") == compiled
+    assert state_provider.list_versions("swan-lake", "full") == ["premiere"]
+    assert (
+        state_provider.read_running("swan-lake", "full", "premiere") == swan_lake_graph
+    )
+
+
+def test_unreadable_and_incompatible_graphs(
+    tmp_path: Path, state_provider: state.StateProvider
+):
+    with pytest.raises(state.UnreadableGraph) as error:
+        state_provider.read_graph("odette")
+    assert error.value.value.endswith("odette.json")
+
+    (tmp_path / "state/graph/odile.json").write_text(json.dumps({"name": "odile"}))
+    with pytest.raises(state.IncompatibleGraph):
+        state_provider.read_graph("odile")
+
+
+def test_state_provider_ledger(
+    state_provider: state.StateProvider, swan_lake_graph: graph.Graph
+):
+    compiled = swan_lake_graph.compile_graph("full", *swan_lake_graph.full_io())
+    graph.Executor(ledger=state_provider.ledger).run(compiled, "premiere")
+
+    runs = state_provider.read_runs("swan-lake", "full", status="success")
+    assert runs.num_rows == len(swan_lake_graph.processes)
+    assert state_provider.read_runs(version="reprise").num_rows == 0
+
+
+def test_reads_are_cached_until_the_file_changes(
+    tmp_path: Path, state_provider: state.StateProvider, swan_lake_graph: graph.Graph
+):
+    state_provider.write_graph(swan_lake_graph)
+    first = state_provider.read_graph("swan-lake")
+    assert state_provider.read_graph("swan-lake") is first
+
+    state_provider.write_graph(swan_lake_graph)
+    second = state_provider.read_graph("swan-lake")
+    assert second is not first
+    assert second == first
+
+    graph_file = tmp_path / "state/graph/swan-lake.json"
+    graph_json = json.loads(graph_file.read_text())
+    graph_json["name"] = "black-swan"
+    graph_file.write_text(json.dumps(graph_json, indent=2))
+    assert state_provider.read_graph("swan-lake").name == "black-swan"
+
+
+def test_construct_matches_validation(swan_lake_graph: graph.Graph):
+    compiled = swan_lake_graph.compile_graph("full", *swan_lake_graph.full_io())
+    for value in [swan_lake_graph, compiled]:
+        model_json = json.loads(json.dumps(value.model_dump()))
+        constructed = state.construct(type(value), model_json)
+        assert constructed == type(value).model_validate(model_json)
+        assert constructed.model_dump() == value.model_dump()
+        assert hash(constructed) == hash(value)
+
+
+def test_trusted_reads_skip_validation(
+    tmp_path: Path,
+    state_provider: state.StateProvider,
+    swan_lake_graph: graph.Graph,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    validated = []
+    model_validate = graph.Graph.model_validate
+    monkeypatch.setattr(
+        graph.Graph,
+        "model_validate",
+        classmethod(lambda cls, data: validated.append(data) or model_validate(data)),
+    )
+    state_provider.write_graph(swan_lake_graph)
+    assert state_provider.read_graph("swan-lake") == swan_lake_graph
+    assert validated == []
+
+    # edited by hand, the digest no longer matches
+    graph_file = tmp_path / "state/graph/swan-lake.json"
+    graph_file.write_text(json.dumps(json.loads(graph_file.read_text()), indent=4))
+    assert state_provider.read_graph("swan-lake") == swan_lake_graph
+    assert len(validated) == 1
+
+
+def test_model_cache_is_bounded():
+    cache = state.ModelCache(maxsize=2)
+    cache.put(("odette", str), 1, "white")
+    cache.put(("odile", str), 1, "black")
+    assert cache.get(("odette", str), 1) == "white"
+    cache.put(("siegfried", str), 1, "prince")
+
+    assert cache.get(("odile", str), 1) is None
+    assert cache.get(("odette", str), 2) is None
+    assert cache.get(("siegfried", str), 1) == "prince"
+    cache.invalidate("siegfried")
+    assert cache.get(("siegfried", str), 1) is None
+    cache.clear()
+    assert cache.get(("odette", str), 1) is None
+
+
+@pytest.fixture(params=["file", "mock"])
+def object_state_provider(request, tmp_path: Path) -> state.ObjectStateProvider:
+    # the mock filesystem is an in-memory object store shared through the pool
+    root = f"file://{tmp_path}" if request.param == "file" else f"mock://{tmp_path}"
+    return state.ObjectStateProvider(
+        graph_uri=f"{root}/state/graph/",
+        compiled_uri=f"{root}/state/compiled/",
+        running_uri=f"{root}/state/run/",
+        ledger_uri=f"file://{tmp_path}/state/ledger/",
+    )
+
+
+def test_object_store_roundtrip(
+    object_state_provider: state.ObjectStateProvider, swan_lake_graph: graph.Graph
+):
+    provider = object_state_provider
+    compiled = swan_lake_graph.compile_graph("full", *swan_lake_graph.full_io())
+    provider.write_graph(swan_lake_graph)
+    provider.write_compiled("swan-lake", compiled)
+    provider.write_running("swan-lake", "full", "premiere", swan_lake_graph)
+    provider.write_running("swan-lake", "full", "reprise", swan_lake_graph)
+    provider.write_running("swan-lake", "act-1", "premiere", swan_lake_graph)
+
+    assert provider.list_graphs() == ["swan-lake"]
+    assert provider.list_compiled("swan-lake") == ["full"]
+    assert sorted(provider.list_versions("swan-lake", "full")) == [
+        "premiere",
+        "reprise",
+    ]
+    versions = provider.list_all_versions("swan-lake")
+    assert {k: sorted(v) for k, v in versions.items()} == {
+        "act-1": ["premiere"],
+        "full": ["premiere", "reprise"],
+    }
+    assert provider.read_graph("swan-lake") == swan_lake_graph
+    assert provider.read_graph("swan-lake") is provider.read_graph("swan-lake")
+    assert provider.read_compiled("swan-lake", "full") == compiled
+    assert provider.read_running("swan-lake", "full", "reprise") == swan_lake_graph
+    with pytest.raises(state.UnreadableGraph):
+        provider.read_running("swan-lake", "full", "matinee")
+
+
+def test_local_list_all_versions(
+    state_provider: state.StateProvider, swan_lake_graph: graph.Graph
+):
+    state_provider.write_running("swan-lake", "full", "premiere", swan_lake_graph)
+    assert state_provider.list_all_versions("swan-lake") == {"full": ["premiere"]}
+
+
+@pytest.fixture
+def sqlite_state_provider(tmp_path: Path) -> state.SqliteStateProvider:
+    return state.SqliteStateProvider(db_uri=f"file://{tmp_path}/state/harmonia.db")
+
+
+def test_sqlite_roundtrip(
+    sqlite_state_provider: state.SqliteStateProvider, swan_lake_graph: graph.Graph
+):
+    provider = sqlite_state_provider
+    compiled = swan_lake_graph.compile_graph("full", *swan_lake_graph.full_io())
+    provider.write_graph(swan_lake_graph)
+    provider.write_compiled("swan-lake", compiled)
+    provider.write_running("swan-lake", "full", "premiere", swan_lake_graph)
+    provider.write_running("swan-lake", "full", "reprise", swan_lake_graph)
+
+    assert provider.list_graphs() == ["swan-lake"]
+    assert provider.read_graph("swan-lake") == swan_lake_graph
+    assert provider.list_compiled("swan-lake") == ["full"]
+    assert provider.read_compiled("swan-lake", "full") == compiled
+    assert provider.list_versions("swan-lake", "full") == ["premiere", "reprise"]
+    assert provider.list_all_versions("swan-lake") == {"full": ["premiere", "reprise"]}
+    assert provider.read_running("swan-lake", "full", "reprise") == swan_lake_graph
+
+    provider.write_running("swan-lake", "full", "reprise", compiled)
+    with pytest.raises(state.IncompatibleGraph):
+        provider.read_running("swan-lake", "full", "reprise")
+
+    with pytest.raises(state.UnreadableGraph):
+        provider.read_graph("odette")
+
+
+def test_sqlite_rereads_a_body_rewritten_in_place(
+    sqlite_state_provider: state.SqliteStateProvider, swan_lake_graph: graph.Graph
+):
+    provider = sqlite_state_provider
+    provider.write_graph(swan_lake_graph)
+    assert provider.read_graph("swan-lake") == swan_lake_graph
+
+    data = swan_lake_graph.model_dump()
+    data["processes"][0]["node"]["cmd"] = ["true"]
+    body = json.dumps(data, indent=2)
+    with provider.connection() as connection:
+        connection.execute(
+            "UPDATE graphs SET body = ?, digest = ? WHERE name = ?",
+            (body, state.digest(graph.Graph, body), "swan-lake"),
+        )
+
+    assert provider.read_graph("swan-lake").processes[0].node.cmd == ("true",)
+
+
+def test_sqlite_ledger_and_latest_version(
+    sqlite_state_provider: state.SqliteStateProvider, swan_lake_graph: graph.Graph
+):
+    provider = sqlite_state_provider
+    compiled = swan_lake_graph.compile_graph("full", *swan_lake_graph.full_io())
+    graph.Executor(ledger=provider.ledger).run(compiled, "premiere")
+    graph.Executor(ledger=provider.ledger).run(compiled, "reprise")
+
+    runs = provider.read_runs("swan-lake", "full", status="success")
+    assert runs.schema == state.RUN_SCHEMA
+    assert runs.num_rows == 2 * len(swan_lake_graph.processes)
+    assert provider.read_runs(version="matinee").num_rows == 0
+    assert provider.latest_version("swan-lake", "full") == "reprise"
+
+    failed = runs.filter(state.pc.equal(runs["version"], "reprise")).to_pylist()[0]
+    provider.record_runs([{**failed, "status": "failed", "exit_code": 1}])
+    assert provider.latest_version("swan-lake", "full") == "premiere"
+
+
+def test_sqlite_lists_running_processes(
+    sqlite_state_provider: state.SqliteStateProvider,
+):
+    provider = sqlite_state_provider
+    now = datetime.now(UTC)
+    provider.append_events(
+        "swan-lake",
+        "full",
+        "premiere",
+        [
+            journal.RunEvent(process="odette", status="started", at=now),
+            journal.RunEvent(process="odile", status="started", at=now),
+        ],
+    )
+    provider.append_events(
+        "swan-lake",
+        "full",
+        "premiere",
+        [journal.RunEvent(process="odile", status="success", at=now, exit_code=0)],
+    )
+
+    assert provider.processes_with_status("started") == [
+        ("swan-lake", "full", "premiere", "odette")
+    ]
+    assert provider.processes_with_status("success", "swan-lake", "full") == [
+        ("swan-lake", "full", "premiere", "odile")
+    ]
+    assert provider.processes_with_status("started", version="reprise") == []
+    plan = provider.connection().execute(
+        "EXPLAIN QUERY PLAN SELECT process FROM statuses WHERE status = ?",
+        ["started"],
+    )
+    assert "statuses_by_status" in str(plan.fetchall())
+
+
+@pytest.fixture(params=["local", "object", "sqlite"])
+def journaled_provider(request, tmp_path: Path):
+    if request.param == "sqlite":
+        return state.SqliteStateProvider(db_uri=f"file://{tmp_path}/state/harmonia.db")
+    (tmp_path / "state/run/swan-lake/full").mkdir(parents=True)
+    if request.param == "object":
+        return state.ObjectStateProvider(running_uri=f"mock://{tmp_path}/state/run/")
+    return state.StateProvider(running_uri=f"file://{tmp_path}/state/run/")
+
+
+def test_running_journal(journaled_provider, swan_lake_graph: graph.Graph):
+    provider = journaled_provider
+    compiled = swan_lake_graph.compile_graph("full", *swan_lake_graph.full_io())
+    running_journal = journal.RunningJournal(provider, compact_every=5)
+    graph.Executor(journal=running_journal).run(compiled, "premiere")
+
+    running = provider.read_running_state("swan-lake", "full", "premiere")
+    names = sorted(p.node.name for p in compiled.order)
+    assert running.with_status("success") == names
+    assert running.with_status("started") == []
+    assert running.edges == {
+        e.build_uri("premiere") for p in compiled.order for e in p.output_edges
+    }
+
+    provider.compact_running("swan-lake", "full", "premiere")
+    assert provider.read_running_state("swan-lake", "full", "premiere") == running
+    assert provider.read_running_state("swan-lake", "full", "reprise") == (
+        journal.RunningState()
+    )
+
+
+def test_failed_compaction_keeps_the_journal(tmp_path: Path, monkeypatch):
+    run_dir = tmp_path / "state/run/swan-lake/full"
+    run_dir.mkdir(parents=True)
+    provider = state.StateProvider(running_uri=f"file://{tmp_path}/state/run/")
+    at = datetime.now(UTC)
+    provider.append_events(
+        "swan-lake",
+        "full",
+        "premiere",
+        [journal.RunEvent(process="odette", status="success", at=at)],
+    )
+    provider.compact_running("swan-lake", "full", "premiere")
+    provider.append_events(
+        "swan-lake",
+        "full",
+        "premiere",
+        [journal.RunEvent(process="odile", status="failed", at=at)],
+    )
+    running = provider.read_running_state("swan-lake", "full", "premiere")
+
+    def crash(source, destination):
+        raise OSError("Disk is gone")
+
+    monkeypatch.setattr(state.os, "replace", crash)
+    with pytest.raises(OSError, match="Disk is gone"):
+        provider.compact_running("swan-lake", "full", "premiere")
+    monkeypatch.undo()
+
+    assert provider.read_running_state("swan-lake", "full", "premiere") == running
+    assert sorted(f.name for f in run_dir.iterdir()) == [
+        "premiere.journal",
+        "premiere.state",
+    ]
+
+
+def test_journal_ignores_a_torn_last_line():
+    event = journal.RunEvent(process="odette", status="started", at=datetime.now(UTC))
+    lines = f"{event.model_dump_json()}\n" + event.model_dump_json()[:10]
+    assert journal.replay(lines).processes == {"odette": "started"}
@@ -0,0 +1,66 @@
+import sys
+import time
+
+from harmonia.base import graph, log, supervisor
+
+
+def _sleeper(name: str, seconds: float, factory: log.LogProviderFactory) -> graph.Node:
+    return graph.Node(
+        name=name,
+        cmd=[sys.executable, "-c", f"import time; time.sleep({seconds})"],
+        log_provider_factory=factory,
+    )
+
+
+def test_heartbeat_does_not_block(log_provider_factory: log.LogProviderFactory):
+    node = _sleeper("adagio", 0.5, log_provider_factory)
+    metadata = node.run("lento", [])
+
+    start = time.monotonic()
+    assert node.heartbeat(metadata, "lento") is None
+    assert time.monotonic() - start < 0.05
+    metadata.meta.wait()
+    assert node.heartbeat(metadata, "lento") == 0
+
+
+def test_supervisor_reports_exits_in_order(
+    log_provider_factory: log.LogProviderFactory,
+):
+    sup = supervisor.Supervisor()
+    slow = _sleeper("largo", 0.4, log_provider_factory).run("lento", [])
+    fast = _sleeper("presto", 0.1, log_provider_factory).run("lento", [])
+    sup.register(slow)
+    sup.register(fast)
+    assert len(sup) == 2
+
+    assert sup.wait(0) == []
+    assert sup.wait() == [fast]
+    assert fast.poll() == 0
+    assert sup.wait() == [slow]
+    assert len(sup) == 0
+    assert sup.wait() == []
+    sup.close()
+
+
+def test_supervisor_wait_times_out(log_provider_factory: log.LogProviderFactory):
+    sup = supervisor.Supervisor()
+    metadata = _sleeper("grave", 0.5, log_provider_factory).run("lento", [])
+    sup.register(metadata)
+
+    start = time.monotonic()
+    assert sup.wait(0.1) == []
+    assert time.monotonic() - start < 0.3
+    sup.close()
+    metadata.meta.wait()
+
+
+def test_supervisor_polls_reaped_children(
+    log_provider_factory: log.LogProviderFactory,
+):
+    sup = supervisor.Supervisor()
+    metadata = _sleeper("vivace", 0, log_provider_factory).run("lento", [])
+    metadata.meta.wait()
+    sup.register(metadata)
+
+    assert sup.wait() == [metadata]
+    sup.close()
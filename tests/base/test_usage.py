@@ -0,0 +1,31 @@
+import subprocess
+import sys
+
+import pytest
+
+from harmonia.base import usage
+
+
+def test_reap_reports_resource_usage(tmp_path):
+    script = (
+        f"open({str(tmp_path / 'score.bin')!r}, 'wb').write(b'x' * 1_000_000); "
+        "sum(range(1_000_000)); exit(3)"
+    )
+    process = subprocess.Popen([sys.executable, "-c", script])
+
+    return_code, process_usage = usage.reap(process.pid, block=True)
+    assert return_code == 3
+    assert process_usage["user_cpu_seconds"] > 0
+    assert process_usage["max_rss_bytes"] > 1 << 20
+    if "write_bytes" in process_usage:
+        assert process_usage["write_bytes"] >= 0
+
+    with pytest.raises(ChildProcessError):
+        usage.reap(process.pid)
+
+
+def test_reap_does_not_wait_for_running_children():
+    process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(1)"])
+    assert usage.reap(process.pid) is None
+    process.kill()
+    assert usage.reap(process.pid, block=True)[0] == -9
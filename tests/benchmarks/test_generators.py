@@ -0,0 +1,22 @@
+import pytest
+
+from benchmarks import generators
+
+
+@pytest.mark.parametrize("shape", list(generators.GENERATORS))
+def test_generated_graphs_are_valid(shape: str):
+    graph = generators.build(shape, 200)
+    inputs, _, outputs = graph.full_io()
+    compiled = graph.compile_graph("all", *graph.full_io())
+
+    assert len(graph.processes) == 200
+    assert len(inputs) == 1
+    assert not compiled.is_disjoint(outputs[0])
+    assert len(compiled.order) == 200
+
+
+def test_noop_graph_runs():
+    graph = generators.noop(3)
+    compiled = graph.compile_graph("noop", *graph.full_io())
+    assert len(compiled.levels) == 1
+    assert all(p.node.cmd == ("true",) for p in compiled.order)
@@ -1,4 +1,5 @@
 import sys
+from collections.abc import Callable
 from pathlib import Path
 
 import pytest
@@ -13,6 +14,46 @@ def log_provider_factory(tmp_path: Path) -> log.LogProviderFactory:
     )
 
 
+@pytest.fixture
+def process_factory(
+    log_provider_factory: log.LogProviderFactory,
+) -> Callable[..., graph.Process]:
+    """Build processes appending their name to ``record`` as they run.
+
+    With ``writes`` a process also writes its inputs followed by its name to
+    its output, edges are then passed as plain paths.
+    """
+
+    def make(
+        name: str,
+        input_edges: list[graph.Edge],
+        output_edges: list[graph.Edge],
+        exit_code: int = 0,
+        record: Path | None = None,
+        writes: bool = False,
+    ) -> graph.Process:
+        script = "import sys, time; time.sleep(0.05); "
+        if record is not None:
+            script += f"open({str(record)!r}, 'a').write({name!r} + '\\n'); "
+        if writes:
+            script += (
+                "open(sys.argv[-1], 'w').write("
+                f"''.join(open(p).read() for p in sys.argv[1:-1]) + {name!r}); "
+            )
+        return graph.Process(
+            node=graph.Node(
+                name=name,
+                cmd=[sys.executable, "-c", script + f"sys.exit({exit_code})"],
+                log_provider_factory=log_provider_factory,
+            ),
+            input_edges=input_edges,
+            output_edges=output_edges,
+            strip_scheme=writes,
+        )
+
+    return make
+
+
 @pytest.fixture
 def swan_lake_graph(log_provider_factory: log.LogProvider) -> graph.Graph:
     e_act_1 = graph.Edge(uri="file://./data/act-1/score/")